@@ -1,7 +1,8 @@
 # Database module initialization
-from .db_manager import DatabaseManager
-from .user_repository import UserRepository
+from .db_manager import DatabaseManager, Predicate
+from .user_repository import UserRepository, LoginRateLimitError
 from .behavior_repository import BehaviorRepository
 from .anomaly_repository import AnomalyRepository
 
-__all__ = ['DatabaseManager', 'UserRepository', 'BehaviorRepository', 'AnomalyRepository']
\ No newline at end of file
+__all__ = ['DatabaseManager', 'Predicate', 'UserRepository', 'LoginRateLimitError', 'BehaviorRepository',
+           'AnomalyRepository']
\ No newline at end of file
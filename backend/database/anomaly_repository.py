@@ -6,7 +6,7 @@ import uuid
 import numpy as np
 from typing import Dict, Any, Optional, List, Tuple, Union
 
-from .db_manager import DatabaseManager
+from .db_manager import DatabaseManager, Predicate
 
 logger = logging.getLogger(__name__)
 
@@ -289,8 +289,7 @@ class AnomalyRepository:
                         'threshold': threshold,
                         'updated_at': now
                     },
-                    "id = ?",
-                    (threshold_id,)
+                    [Predicate('id', 'eq', threshold_id)]
                 )
                 
                 logger.info(f"Updated {detector_type} threshold for user {user_id} to {threshold}")
@@ -380,8 +379,7 @@ class AnomalyRepository:
                         'version': version,
                         'metrics': json.dumps(metrics) if metrics else None
                     },
-                    "id = ?",
-                    (model_id,)
+                    [Predicate('id', 'eq', model_id)]
                 )
                 
                 logger.info(f"Updated {model_type} model for user {user_id} to version {version}")
@@ -472,8 +470,7 @@ class AnomalyRepository:
         try:
             rows_affected = self.db.delete(
                 'anomaly_models',
-                "user_id = ? AND model_type = ?",
-                (user_id, model_type)
+                [Predicate('user_id', 'eq', user_id), Predicate('model_type', 'eq', model_type)]
             )
             
             return rows_affected > 0
@@ -611,8 +608,7 @@ class AnomalyRepository:
             rows_affected = self.db.update(
                 'anomaly_alerts',
                 data,
-                "id = ?",
-                (alert_id,)
+                [Predicate('id', 'eq', alert_id)]
             )
             
             return rows_affected > 0
@@ -711,17 +707,12 @@ class AnomalyRepository:
             Dictionary with counts of deleted records by type
         """
         try:
-            # Start transaction
-            self.db.begin_transaction()
-            
-            # Delete data from each table
-            alerts_count = self.db.delete('anomaly_alerts', "user_id = ?", (user_id,))
-            results_count = self.db.delete('anomaly_results', "user_id = ?", (user_id,))
-            thresholds_count = self.db.delete('anomaly_thresholds', "user_id = ?", (user_id,))
-            models_count = self.db.delete('anomaly_models', "user_id = ?", (user_id,))
-            
-            # Commit transaction
-            self.db.commit()
+            # Delete data from each table in one transaction
+            with self.db.transaction():
+                alerts_count = self.db.delete('anomaly_alerts', [Predicate('user_id', 'eq', user_id)])
+                results_count = self.db.delete('anomaly_results', [Predicate('user_id', 'eq', user_id)])
+                thresholds_count = self.db.delete('anomaly_thresholds', [Predicate('user_id', 'eq', user_id)])
+                models_count = self.db.delete('anomaly_models', [Predicate('user_id', 'eq', user_id)])
             
             logger.info(f"Deleted all anomaly data for user {user_id}")
             
@@ -733,7 +724,5 @@ class AnomalyRepository:
             }
             
         except Exception as e:
-            # Rollback transaction
-            self.db.rollback()
             logger.error(f"Error deleting anomaly data for user {user_id}: {e}")
             raise
\ No newline at end of file
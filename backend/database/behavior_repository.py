@@ -3,13 +3,56 @@ import logging
 import json
 import time
 import uuid
+import struct
 import numpy as np
-from typing import Dict, Any, Optional, List, Tuple, Union
+from typing import Dict, Any, Optional, List, Tuple, Union, Sequence, Iterator
 
-from .db_manager import DatabaseManager
+try:
+    import lz4.block
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+from .db_manager import DatabaseManager, Predicate
 
 logger = logging.getLogger(__name__)
 
+# Header of LZ4-compressed profile data: magic with format version, then the
+# uncompressed length as a little-endian uint32
+_PROFILE_LZ4_MAGIC = b'BPZ\x01'
+_PROFILE_LZ4_HEADER = struct.Struct('<4sI')
+
+# Fixed-shape keystroke profile: per-key dwell and flight time statistics
+KEYSTROKE_PROFILE_DTYPE = np.dtype([
+    ('key', '<u2'),
+    ('dwell_mean', '<f4'),
+    ('dwell_std', '<f4'),
+    ('flight_mean', '<f4'),
+    ('flight_std', '<f4')
+])
+
+# Header of array profile data: magic, format version and dtype code, followed
+# by the raw little-endian array bytes
+_PROFILE_ARRAY_MAGIC = b'BPA\x00'
+_PROFILE_ARRAY_HEADER = struct.Struct('<4sHH')
+_PROFILE_ARRAY_VERSION = 1
+_PROFILE_ARRAY_DTYPES = {
+    1: KEYSTROKE_PROFILE_DTYPE,
+    2: np.dtype('<f4')
+}
+
+# PostgreSQL batches larger than this are loaded with COPY instead of INSERT
+BULK_COPY_MIN_ROWS = 100
+
+# Columns of behavior_sessions that callers may select explicitly
+SESSION_COLUMNS = (
+    'id', 'user_id', 'session_type', 'device_info', 'ip_address',
+    'geo_location', 'started_at', 'ended_at'
+)
+
+# Columns of behavior_sessions stored as JSON text
+SESSION_JSON_COLUMNS = ('device_info', 'geo_location')
+
 class BehaviorRepository:
     """Repository for behavioral data storage and retrieval."""
     
@@ -45,12 +88,9 @@ class BehaviorRepository:
         )
         
         # Keystroke data table
-        self.db.create_table(
-            'keystroke_data',
-            """
+        keystroke_schema = """
             id TEXT PRIMARY KEY,
             session_id TEXT NOT NULL,
-            user_id TEXT NOT NULL,
             timestamp INTEGER NOT NULL,
             key_code INTEGER,
             key_name TEXT,
@@ -59,18 +99,14 @@ class BehaviorRepository:
             dwell_time INTEGER,
             flight_time INTEGER,
             context TEXT,
-            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE
             """
-        )
+        self.db.create_table('keystroke_data', keystroke_schema)
         
         # Mouse data table
-        self.db.create_table(
-            'mouse_data',
-            """
+        mouse_schema = """
             id TEXT PRIMARY KEY,
             session_id TEXT NOT NULL,
-            user_id TEXT NOT NULL,
             timestamp INTEGER NOT NULL,
             event_type TEXT NOT NULL,
             x INTEGER,
@@ -80,10 +116,9 @@ class BehaviorRepository:
             movement_direction REAL,
             click_duration INTEGER,
             context TEXT,
-            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE
             """
-        )
+        self.db.create_table('mouse_data', mouse_schema)
         
         # Device data table
         self.db.create_table(
@@ -146,20 +181,28 @@ class BehaviorRepository:
             """
         )
         
+        # Tables created before user_id was dropped still have it as NOT NULL,
+        # which every insert would now violate
+        self.db.drop_column('keystroke_data', 'user_id', keystroke_schema)
+        self.db.drop_column('mouse_data', 'user_id', mouse_schema)
+        
         # Create indexes
-        self.db.create_index('behavior_sessions', ['user_id'])
-        self.db.create_index('keystroke_data', ['user_id', 'session_id'])
+        self.db.create_index('behavior_sessions', ['user_id', 'started_at'])
+        self.db.create_index('keystroke_data', ['session_id'])
         self.db.create_index('keystroke_data', ['timestamp'])
-        self.db.create_index('mouse_data', ['user_id', 'session_id'])
+        self.db.create_index('mouse_data', ['session_id'])
         self.db.create_index('mouse_data', ['timestamp'])
         self.db.create_index('device_data', ['user_id', 'session_id'])
+        self.db.create_index('device_data', ['session_id', 'timestamp'])
         self.db.create_index('geo_data', ['user_id', 'session_id'])
+        self.db.create_index('geo_data', ['session_id', 'timestamp'])
         self.db.create_index('behavior_profiles', ['user_id', 'profile_type'], unique=True)
         
         logger.info("Behavior tables initialized")
     
     def create_session(self, user_id: str, session_type: str, device_info: Optional[Dict[str, Any]] = None, 
-                      ip_address: Optional[str] = None, geo_location: Optional[Dict[str, Any]] = None) -> str:
+                      ip_address: Optional[str] = None, geo_location: Optional[Dict[str, Any]] = None,
+                      now: Optional[int] = None) -> str:
         """Create a new behavior session.
         
         Args:
@@ -168,13 +211,15 @@ class BehaviorRepository:
             device_info: Device information (optional)
             ip_address: IP address (optional)
             geo_location: Geographic location (optional)
+            now: Current Unix timestamp (optional)
             
         Returns:
             Session ID
         """
         try:
             session_id = str(uuid.uuid4())
-            now = int(time.time())
+            if now is None:
+                now = self._now()
             
             self.db.insert(
                 'behavior_sessions',
@@ -197,23 +242,24 @@ class BehaviorRepository:
             logger.error(f"Error creating behavior session for user {user_id}: {e}")
             raise
     
-    def end_session(self, session_id: str) -> bool:
+    def end_session(self, session_id: str, now: Optional[int] = None) -> bool:
         """End a behavior session.
         
         Args:
             session_id: Session ID
+            now: Current Unix timestamp (optional)
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            now = int(time.time())
+            if now is None:
+                now = self._now()
             
             rows_affected = self.db.update(
                 'behavior_sessions',
                 {'ended_at': now},
-                "id = ? AND ended_at IS NULL",
-                (session_id,)
+                [Predicate('id', 'eq', session_id), Predicate('ended_at', 'eq', None)]
             )
             
             if rows_affected > 0:
@@ -255,28 +301,44 @@ class BehaviorRepository:
             logger.error(f"Error getting behavior session {session_id}: {e}")
             raise
     
-    def get_user_sessions(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_user_sessions(self, user_id: str, limit: int = 10,
+                          columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Get recent behavior sessions for a user.
         
+        Only the selected JSON columns are decoded, so listings that skip
+        ``device_info`` and ``geo_location`` never parse them.
+        
         Args:
             user_id: User ID
             limit: Maximum number of sessions to return
+            columns: Columns to select (optional, defaults to all columns)
             
         Returns:
             List of session data
+            
+        Raises:
+            ValueError: If an unknown column is requested
         """
+        if columns:
+            unknown = [col for col in columns if col not in SESSION_COLUMNS]
+            if unknown:
+                raise ValueError(f"Unknown behavior_sessions columns: {unknown}")
+            select_clause = ', '.join(columns)
+        else:
+            select_clause = '*'
+        
         try:
             sessions = self.db.fetch_all(
-                "SELECT * FROM behavior_sessions WHERE user_id = ? ORDER BY started_at DESC LIMIT ?",
+                f"SELECT {select_clause} FROM behavior_sessions WHERE user_id = ? ORDER BY started_at DESC LIMIT ?",
                 (user_id, limit)
             )
             
             # Parse JSON fields
+            json_columns = [col for col in SESSION_JSON_COLUMNS if not columns or col in columns]
             for session in sessions:
-                if session.get('device_info'):
-                    session['device_info'] = json.loads(session['device_info'])
-                if session.get('geo_location'):
-                    session['geo_location'] = json.loads(session['geo_location'])
+                for col in json_columns:
+                    if session.get(col):
+                        session[col] = json.loads(session[col])
             
             return sessions
             
@@ -284,26 +346,29 @@ class BehaviorRepository:
             logger.error(f"Error getting behavior sessions for user {user_id}: {e}")
             raise
     
-    def store_keystroke_data(self, session_id: str, user_id: str, keystroke_data: Dict[str, Any]) -> str:
+    def store_keystroke_data(self, session_id: str, user_id: str, keystroke_data: Dict[str, Any],
+                             now: Optional[int] = None) -> str:
         """Store keystroke data.
         
         Args:
             session_id: Session ID
-            user_id: User ID
+            user_id: User ID (implied by the session, not stored)
             keystroke_data: Keystroke data
+            now: Current Unix timestamp (optional)
             
         Returns:
             Data ID
         """
         try:
             data_id = str(uuid.uuid4())
+            if now is None:
+                now = self._now()
             
             # Prepare data
             data = {
                 'id': data_id,
                 'session_id': session_id,
-                'user_id': user_id,
-                'timestamp': keystroke_data.get('timestamp', int(time.time())),
+                'timestamp': keystroke_data.get('timestamp', now),
                 'key_code': keystroke_data.get('key_code'),
                 'key_name': keystroke_data.get('key_name'),
                 'press_time': keystroke_data.get('press_time'),
@@ -325,7 +390,7 @@ class BehaviorRepository:
         
         Args:
             session_id: Session ID
-            user_id: User ID
+            user_id: User ID (implied by the session, not stored)
             keystroke_batch: List of keystroke data
             
         Returns:
@@ -333,41 +398,56 @@ class BehaviorRepository:
         """
         try:
             # Prepare data
-            now = int(time.time())
+            now = self._now()
             params_list = []
             
             for keystroke in keystroke_batch:
-                data_id = str(uuid.uuid4())
-                params = (
-                    data_id,
-                    session_id,
-                    user_id,
-                    keystroke.get('timestamp', now),
-                    keystroke.get('key_code'),
-                    keystroke.get('key_name'),
-                    keystroke.get('press_time'),
-                    keystroke.get('release_time'),
-                    keystroke.get('dwell_time'),
-                    keystroke.get('flight_time'),
-                    keystroke.get('context')
-                )
-                params_list.append(params)
+                params_list.append({
+                    'id': str(uuid.uuid4()),
+                    'session_id': session_id,
+                    'timestamp': keystroke.get('timestamp', now),
+                    'key_code': keystroke.get('key_code'),
+                    'key_name': keystroke.get('key_name'),
+                    'press_time': keystroke.get('press_time'),
+                    'release_time': keystroke.get('release_time'),
+                    'dwell_time': keystroke.get('dwell_time'),
+                    'flight_time': keystroke.get('flight_time'),
+                    'context': keystroke.get('context')
+                })
             
             # Insert batch
-            query = """
-                INSERT INTO keystroke_data 
-                (id, session_id, user_id, timestamp, key_code, key_name, press_time, 
-                release_time, dwell_time, flight_time, context) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            self.db.execute_many(query, params_list)
+            self._store_batch('keystroke_data', params_list)
             return len(params_list)
             
         except Exception as e:
             logger.error(f"Error storing keystroke batch for session {session_id}: {e}")
             raise
     
+    def iter_keystroke_data(self, session_id: str, limit: Optional[int] = None,
+                            chunk_size: int = 256) -> Iterator[Dict[str, Any]]:
+        """Iterate over keystroke data for a session.
+        
+        Args:
+            session_id: Session ID
+            limit: Maximum number of records to return (optional)
+            chunk_size: Number of records fetched from the database at a time
+            
+        Yields:
+            Keystroke data, oldest first
+        """
+        query = "SELECT * FROM keystroke_data WHERE session_id = ? ORDER BY timestamp ASC"
+        params = (session_id,)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        
+        try:
+            yield from self.db.stream(query, params, chunk_size)
+            
+        except Exception as e:
+            logger.error(f"Error getting keystroke data for session {session_id}: {e}")
+            raise
+    
     def get_keystroke_data(self, session_id: str, limit: int = 1000) -> List[Dict[str, Any]]:
         """Get keystroke data for a session.
         
@@ -378,14 +458,36 @@ class BehaviorRepository:
         Returns:
             List of keystroke data
         """
+        return list(self.iter_keystroke_data(session_id, limit))
+    
+    def iter_user_keystroke_data(self, user_id: str, limit: Optional[int] = None,
+                                 chunk_size: int = 256) -> Iterator[Dict[str, Any]]:
+        """Iterate over keystroke data for a user across all sessions.
+        
+        Args:
+            user_id: User ID
+            limit: Maximum number of records to return (optional)
+            chunk_size: Number of records fetched from the database at a time
+            
+        Yields:
+            Keystroke data, newest first
+        """
+        query = """
+            SELECT k.* FROM keystroke_data k
+            JOIN behavior_sessions s ON k.session_id = s.id
+            WHERE s.user_id = ?
+            ORDER BY k.timestamp DESC
+        """
+        params = (user_id,)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        
         try:
-            return self.db.fetch_all(
-                "SELECT * FROM keystroke_data WHERE session_id = ? ORDER BY timestamp ASC LIMIT ?",
-                (session_id, limit)
-            )
+            yield from self.db.stream(query, params, chunk_size)
             
         except Exception as e:
-            logger.error(f"Error getting keystroke data for session {session_id}: {e}")
+            logger.error(f"Error getting keystroke data for user {user_id}: {e}")
             raise
     
     def get_user_keystroke_data(self, user_id: str, limit: int = 1000) -> List[Dict[str, Any]]:
@@ -398,36 +500,31 @@ class BehaviorRepository:
         Returns:
             List of keystroke data
         """
-        try:
-            return self.db.fetch_all(
-                "SELECT * FROM keystroke_data WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
-                (user_id, limit)
-            )
-            
-        except Exception as e:
-            logger.error(f"Error getting keystroke data for user {user_id}: {e}")
-            raise
+        return list(self.iter_user_keystroke_data(user_id, limit))
     
-    def store_mouse_data(self, session_id: str, user_id: str, mouse_data: Dict[str, Any]) -> str:
+    def store_mouse_data(self, session_id: str, user_id: str, mouse_data: Dict[str, Any],
+                         now: Optional[int] = None) -> str:
         """Store mouse data.
         
         Args:
             session_id: Session ID
-            user_id: User ID
+            user_id: User ID (implied by the session, not stored)
             mouse_data: Mouse data
+            now: Current Unix timestamp (optional)
             
         Returns:
             Data ID
         """
         try:
             data_id = str(uuid.uuid4())
+            if now is None:
+                now = self._now()
             
             # Prepare data
             data = {
                 'id': data_id,
                 'session_id': session_id,
-                'user_id': user_id,
-                'timestamp': mouse_data.get('timestamp', int(time.time())),
+                'timestamp': mouse_data.get('timestamp', now),
                 'event_type': mouse_data.get('event_type'),  # 'move', 'click', 'scroll'
                 'x': mouse_data.get('x'),
                 'y': mouse_data.get('y'),
@@ -450,7 +547,7 @@ class BehaviorRepository:
         
         Args:
             session_id: Session ID
-            user_id: User ID
+            user_id: User ID (implied by the session, not stored)
             mouse_batch: List of mouse data
             
         Returns:
@@ -458,36 +555,26 @@ class BehaviorRepository:
         """
         try:
             # Prepare data
-            now = int(time.time())
+            now = self._now()
             params_list = []
             
             for mouse_event in mouse_batch:
-                data_id = str(uuid.uuid4())
-                params = (
-                    data_id,
-                    session_id,
-                    user_id,
-                    mouse_event.get('timestamp', now),
-                    mouse_event.get('event_type'),
-                    mouse_event.get('x'),
-                    mouse_event.get('y'),
-                    mouse_event.get('button'),
-                    mouse_event.get('movement_speed'),
-                    mouse_event.get('movement_direction'),
-                    mouse_event.get('click_duration'),
-                    mouse_event.get('context')
-                )
-                params_list.append(params)
+                params_list.append({
+                    'id': str(uuid.uuid4()),
+                    'session_id': session_id,
+                    'timestamp': mouse_event.get('timestamp', now),
+                    'event_type': mouse_event.get('event_type'),
+                    'x': mouse_event.get('x'),
+                    'y': mouse_event.get('y'),
+                    'button': mouse_event.get('button'),
+                    'movement_speed': mouse_event.get('movement_speed'),
+                    'movement_direction': mouse_event.get('movement_direction'),
+                    'click_duration': mouse_event.get('click_duration'),
+                    'context': mouse_event.get('context')
+                })
             
             # Insert batch
-            query = """
-                INSERT INTO mouse_data 
-                (id, session_id, user_id, timestamp, event_type, x, y, button, 
-                movement_speed, movement_direction, click_duration, context) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            self.db.execute_many(query, params_list)
+            self._store_batch('mouse_data', params_list)
             return len(params_list)
             
         except Exception as e:
@@ -526,7 +613,13 @@ class BehaviorRepository:
         """
         try:
             return self.db.fetch_all(
-                "SELECT * FROM mouse_data WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
+                """
+                SELECT m.* FROM mouse_data m
+                JOIN behavior_sessions s ON m.session_id = s.id
+                WHERE s.user_id = ?
+                ORDER BY m.timestamp DESC
+                LIMIT ?
+                """,
                 (user_id, limit)
             )
             
@@ -534,26 +627,59 @@ class BehaviorRepository:
             logger.error(f"Error getting mouse data for user {user_id}: {e}")
             raise
     
-    def store_device_data(self, session_id: str, user_id: str, device_data: Dict[str, Any]) -> str:
+    def prune_older_than(self, days: int) -> Dict[str, int]:
+        """Delete keystroke and mouse data older than a number of days.
+        
+        The deletes are range scans over the timestamp indexes, so only the
+        expired rows are visited.
+        
+        Args:
+            days: Age in days beyond which data is deleted
+            
+        Returns:
+            Dictionary with counts of deleted records by type
+        """
+        cutoff = self._now() - days * 86400
+        
+        try:
+            keystroke_count = self.db.delete('keystroke_data', [Predicate('timestamp', 'lt', cutoff)])
+            mouse_count = self.db.delete('mouse_data', [Predicate('timestamp', 'lt', cutoff)])
+            
+            logger.info(f"Pruned behavioral data older than {days} days")
+            
+            return {
+                'keystroke_data': keystroke_count,
+                'mouse_data': mouse_count
+            }
+        
+        except Exception as e:
+            logger.error(f"Error pruning behavioral data older than {days} days: {e}")
+            raise
+    
+    def store_device_data(self, session_id: str, user_id: str, device_data: Dict[str, Any],
+                          now: Optional[int] = None) -> str:
         """Store device data.
         
         Args:
             session_id: Session ID
             user_id: User ID
             device_data: Device data
+            now: Current Unix timestamp (optional)
             
         Returns:
             Data ID
         """
         try:
             data_id = str(uuid.uuid4())
+            if now is None:
+                now = self._now()
             
             # Prepare data
             data = {
                 'id': data_id,
                 'session_id': session_id,
                 'user_id': user_id,
-                'timestamp': device_data.get('timestamp', int(time.time())),
+                'timestamp': device_data.get('timestamp', now),
                 'device_type': device_data.get('device_type'),
                 'os_name': device_data.get('os_name'),
                 'os_version': device_data.get('os_version'),
@@ -633,26 +759,30 @@ class BehaviorRepository:
             logger.error(f"Error getting devices for user {user_id}: {e}")
             raise
     
-    def store_geo_data(self, session_id: str, user_id: str, geo_data: Dict[str, Any]) -> str:
+    def store_geo_data(self, session_id: str, user_id: str, geo_data: Dict[str, Any],
+                       now: Optional[int] = None) -> str:
         """Store geographic location data.
         
         Args:
             session_id: Session ID
             user_id: User ID
             geo_data: Geographic location data
+            now: Current Unix timestamp (optional)
             
         Returns:
             Data ID
         """
         try:
             data_id = str(uuid.uuid4())
+            if now is None:
+                now = self._now()
             
             # Prepare data
             data = {
                 'id': data_id,
                 'session_id': session_id,
                 'user_id': user_id,
-                'timestamp': geo_data.get('timestamp', int(time.time())),
+                'timestamp': geo_data.get('timestamp', now),
                 'latitude': geo_data.get('latitude'),
                 'longitude': geo_data.get('longitude'),
                 'accuracy': geo_data.get('accuracy'),
@@ -713,29 +843,27 @@ class BehaviorRepository:
             logger.error(f"Error getting locations for user {user_id}: {e}")
             raise
     
-    def store_behavior_profile(self, user_id: str, profile_type: str, profile_data: Union[Dict[str, Any], np.ndarray, bytes]) -> str:
+    def store_behavior_profile(self, user_id: str, profile_type: str, profile_data: Union[Dict[str, Any], np.ndarray, bytes],
+                               now: Optional[int] = None) -> str:
         """Store a behavior profile.
         
         Args:
             user_id: User ID
             profile_type: Profile type (e.g., 'keystroke', 'mouse', 'device', 'geo')
-            profile_data: Profile data (will be serialized)
+            profile_data: Profile data (will be serialized; floating point arrays
+                are stored as float32)
+            now: Current Unix timestamp (optional)
             
         Returns:
             Profile ID
         """
         try:
-            # Check if profile already exists
-            existing = self.db.fetch_one(
-                "SELECT id, version FROM behavior_profiles WHERE user_id = ? AND profile_type = ?",
-                (user_id, profile_type)
-            )
-            
-            now = int(time.time())
+            if now is None:
+                now = self._now()
             
             # Serialize profile data
             if isinstance(profile_data, np.ndarray):
-                serialized_data = profile_data.tobytes()
+                serialized_data = self._compress_profile_data(self._encode_profile_array(profile_data))
             elif isinstance(profile_data, dict):
                 serialized_data = json.dumps(profile_data).encode('utf-8')
             elif isinstance(profile_data, bytes):
@@ -743,41 +871,27 @@ class BehaviorRepository:
             else:
                 serialized_data = str(profile_data).encode('utf-8')
             
-            if existing:
-                # Update existing profile
-                profile_id = existing['id']
-                version = existing['version'] + 1
-                
-                self.db.update(
-                    'behavior_profiles',
-                    {
-                        'profile_data': serialized_data,
-                        'updated_at': now,
-                        'version': version
-                    },
-                    "id = ?",
-                    (profile_id,)
-                )
-                
-                logger.info(f"Updated {profile_type} profile for user {user_id} to version {version}")
-                
+            # Insert or bump the version of the existing profile in one
+            # autocommitted statement
+            profile = self.db.fetch_one(
+                """
+                INSERT INTO behavior_profiles
+                (id, user_id, profile_type, profile_data, created_at, updated_at, version)
+                VALUES (?, ?, ?, ?, ?, ?, 1)
+                ON CONFLICT (user_id, profile_type) DO UPDATE SET
+                    profile_data = excluded.profile_data,
+                    updated_at = excluded.updated_at,
+                    version = behavior_profiles.version + 1
+                RETURNING id, version
+                """,
+                (str(uuid.uuid4()), user_id, profile_type, serialized_data, now, now)
+            )
+            
+            profile_id = profile['id']
+            
+            if profile['version'] > 1:
+                logger.info(f"Updated {profile_type} profile for user {user_id} to version {profile['version']}")
             else:
-                # Create new profile
-                profile_id = str(uuid.uuid4())
-                
-                self.db.insert(
-                    'behavior_profiles',
-                    {
-                        'id': profile_id,
-                        'user_id': user_id,
-                        'profile_type': profile_type,
-                        'profile_data': serialized_data,
-                        'created_at': now,
-                        'updated_at': now,
-                        'version': 1
-                    }
-                )
-                
                 logger.info(f"Created new {profile_type} profile for user {user_id}")
             
             return profile_id
@@ -802,6 +916,9 @@ class BehaviorRepository:
                 (user_id, profile_type)
             )
             
+            if profile:
+                profile['profile_data'] = self._decompress_profile_data(profile['profile_data'])
+            
             return profile
             
         except Exception as e:
@@ -828,7 +945,7 @@ class BehaviorRepository:
             if not profile:
                 return None
             
-            profile_data = profile['profile_data']
+            profile_data = self._decompress_profile_data(profile['profile_data'])
             
             # Try to deserialize as JSON if requested
             if as_dict:
@@ -843,6 +960,145 @@ class BehaviorRepository:
             logger.error(f"Error getting {profile_type} profile data for user {user_id}: {e}")
             raise
     
+    def get_behavior_profile_array(self, user_id: str, profile_type: str) -> Optional[np.ndarray]:
+        """Get behavior profile data stored from a NumPy array.
+        
+        Args:
+            user_id: User ID
+            profile_type: Profile type (e.g., 'keystroke', 'mouse', 'device', 'geo')
+            
+        Returns:
+            Read-only 1-D array (KEYSTROKE_PROFILE_DTYPE records or float32
+            values) or None if not found
+            
+        Raises:
+            ValueError: If the profile was not stored from an array
+        """
+        try:
+            profile_data = self.get_behavior_profile_data(user_id, profile_type)
+            
+            if profile_data is None:
+                return None
+            
+            return self._decode_profile_array(profile_data)
+            
+        except Exception as e:
+            logger.error(f"Error getting {profile_type} profile array for user {user_id}: {e}")
+            raise
+    
+    def _store_batch(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert a batch of behavioral data rows with the fastest loader for the backend.
+        
+        Large PostgreSQL batches are streamed through COPY; everything else
+        goes through a single multi-row insert.
+        
+        Args:
+            table: Table name
+            rows: Rows to insert as dictionaries sharing the same keys
+        """
+        if self.db.db_type == 'postgresql' and len(rows) > BULK_COPY_MIN_ROWS:
+            columns = list(rows[0].keys())
+            self.db.bulk_copy(table, columns, [tuple(row[col] for col in columns) for row in rows])
+        else:
+            self.db.insert_many(table, rows)
+    
+    def _now(self) -> int:
+        """Get the current Unix timestamp in seconds.
+        
+        Returns:
+            Current Unix timestamp
+        """
+        return time.time_ns() // 1_000_000_000
+    
+    def _encode_profile_array(self, array: np.ndarray) -> bytes:
+        """Serialize an array profile with a header recording its dtype.
+        
+        Args:
+            array: Keystroke profile records or floating point values
+            
+        Returns:
+            Header followed by the array bytes, or the raw array bytes for
+            other dtypes
+        """
+        if array.dtype == KEYSTROKE_PROFILE_DTYPE:
+            code = 1
+        elif np.issubdtype(array.dtype, np.floating):
+            code = 2
+            array = array.astype('<f4')
+        else:
+            return array.tobytes()
+        
+        header = _PROFILE_ARRAY_HEADER.pack(_PROFILE_ARRAY_MAGIC, _PROFILE_ARRAY_VERSION, code)
+        return header + np.ascontiguousarray(array).tobytes()
+    
+    def _decode_profile_array(self, data: bytes) -> np.ndarray:
+        """Rebuild an array profile written by _encode_profile_array.
+        
+        Args:
+            data: Uncompressed profile data
+            
+        Returns:
+            Read-only 1-D array backed by the data
+            
+        Raises:
+            ValueError: If the data has no array header or an unknown format
+        """
+        # psycopg2 returns BYTEA values as memoryview
+        if isinstance(data, (memoryview, bytearray)):
+            data = bytes(data)
+        if not isinstance(data, bytes) or not data.startswith(_PROFILE_ARRAY_MAGIC):
+            raise ValueError("Profile data was not stored from a typed array")
+        
+        _, version, code = _PROFILE_ARRAY_HEADER.unpack_from(data)
+        if version != _PROFILE_ARRAY_VERSION or code not in _PROFILE_ARRAY_DTYPES:
+            raise ValueError(f"Unsupported profile array format (version {version}, dtype {code})")
+        
+        return np.frombuffer(data, dtype=_PROFILE_ARRAY_DTYPES[code], offset=_PROFILE_ARRAY_HEADER.size)
+    
+    def _compress_profile_data(self, data: bytes) -> bytes:
+        """Compress serialized array profile data with LZ4.
+        
+        Args:
+            data: Serialized profile data
+            
+        Returns:
+            Header and compressed payload, or the data unchanged if LZ4 is not
+            available or compression does not reduce its size
+        """
+        if not LZ4_AVAILABLE or len(data) > 0xFFFFFFFF:
+            return data
+        
+        compressed = _PROFILE_LZ4_HEADER.pack(_PROFILE_LZ4_MAGIC, len(data)) + \
+            lz4.block.compress(data, store_size=False)
+        
+        return compressed if len(compressed) < len(data) else data
+    
+    def _decompress_profile_data(self, data: bytes) -> bytes:
+        """Decompress profile data written by _compress_profile_data.
+        
+        Args:
+            data: Stored profile data
+            
+        Returns:
+            Serialized profile data (uncompressed data is returned unchanged,
+            with binary buffers converted to bytes)
+            
+        Raises:
+            RuntimeError: If the data is compressed and LZ4 is not available
+        """
+        # psycopg2 returns BYTEA values as memoryview
+        if isinstance(data, (memoryview, bytearray)):
+            data = bytes(data)
+        
+        if not isinstance(data, bytes) or not data.startswith(_PROFILE_LZ4_MAGIC):
+            return data
+        
+        if not LZ4_AVAILABLE:
+            raise RuntimeError("Profile data is LZ4-compressed but the lz4 package is not installed")
+        
+        _, size = _PROFILE_LZ4_HEADER.unpack_from(data)
+        return lz4.block.decompress(data[_PROFILE_LZ4_HEADER.size:], uncompressed_size=size)
+    
     def delete_behavior_profile(self, user_id: str, profile_type: str) -> bool:
         """Delete a behavior profile.
         
@@ -856,8 +1112,7 @@ class BehaviorRepository:
         try:
             rows_affected = self.db.delete(
                 'behavior_profiles',
-                "user_id = ? AND profile_type = ?",
-                (user_id, profile_type)
+                [Predicate('user_id', 'eq', user_id), Predicate('profile_type', 'eq', profile_type)]
             )
             
             return rows_affected > 0
@@ -876,33 +1131,78 @@ class BehaviorRepository:
             Dictionary with counts of deleted records by type
         """
         try:
-            # Start transaction
-            self.db.begin_transaction()
-            
-            # Delete data from each table
-            keystroke_count = self.db.delete('keystroke_data', "user_id = ?", (user_id,))
-            mouse_count = self.db.delete('mouse_data', "user_id = ?", (user_id,))
-            device_count = self.db.delete('device_data', "user_id = ?", (user_id,))
-            geo_count = self.db.delete('geo_data', "user_id = ?", (user_id,))
-            profile_count = self.db.delete('behavior_profiles', "user_id = ?", (user_id,))
-            session_count = self.db.delete('behavior_sessions', "user_id = ?", (user_id,))
-            
-            # Commit transaction
-            self.db.commit()
+            if self.db.db_type == 'postgresql':
+                # Writable CTEs delete and count everything in one round trip.
+                # The statement is PostgreSQL-only, so it uses psycopg2's placeholders.
+                counts = self.db.fetch_one(
+                    """
+                    WITH s AS (DELETE FROM behavior_sessions WHERE user_id = %s RETURNING id),
+                    p AS (DELETE FROM behavior_profiles WHERE user_id = %s RETURNING 1),
+                    k AS (DELETE FROM keystroke_data WHERE session_id IN (SELECT id FROM s) RETURNING 1),
+                    m AS (DELETE FROM mouse_data WHERE session_id IN (SELECT id FROM s) RETURNING 1),
+                    d AS (DELETE FROM device_data WHERE session_id IN (SELECT id FROM s) RETURNING 1),
+                    g AS (DELETE FROM geo_data WHERE session_id IN (SELECT id FROM s) RETURNING 1)
+                    SELECT
+                        (SELECT COUNT(*) FROM k) AS keystroke_data,
+                        (SELECT COUNT(*) FROM m) AS mouse_data,
+                        (SELECT COUNT(*) FROM d) AS device_data,
+                        (SELECT COUNT(*) FROM g) AS geo_data,
+                        (SELECT COUNT(*) FROM p) AS behavior_profiles,
+                        (SELECT COUNT(*) FROM s) AS behavior_sessions
+                    """,
+                    (user_id, user_id)
+                )
+            elif self.db.db_type == 'mongodb':
+                # MongoDB has no cascades, so session data is deleted by the
+                # user's session IDs before the sessions themselves
+                session_ids = self.db.connection['behavior_sessions'].distinct(
+                    'id', Predicate('user_id', 'eq', user_id).to_mongo()
+                )
+                by_user = [Predicate('user_id', 'eq', user_id)]
+                by_session = [Predicate('session_id', 'in', session_ids)]
+                
+                counts = {
+                    'keystroke_data': self.db.delete('keystroke_data', by_session),
+                    'mouse_data': self.db.delete('mouse_data', by_session),
+                    'device_data': self.db.delete('device_data', by_session),
+                    'geo_data': self.db.delete('geo_data', by_session),
+                    'behavior_profiles': self.db.delete('behavior_profiles', by_user),
+                    'behavior_sessions': self.db.delete('behavior_sessions', by_user)
+                }
+            else:
+                with self.db.transaction():
+                    # Keystroke, mouse, device and geo rows are removed by ON DELETE
+                    # CASCADE from their sessions, so count them before deleting
+                    counts = self.db.fetch_one(
+                        """
+                        WITH s AS (SELECT id FROM behavior_sessions WHERE user_id = ?)
+                        SELECT
+                            (SELECT COUNT(*) FROM keystroke_data WHERE session_id IN (SELECT id FROM s)) AS keystroke_data,
+                            (SELECT COUNT(*) FROM mouse_data WHERE session_id IN (SELECT id FROM s)) AS mouse_data,
+                            (SELECT COUNT(*) FROM device_data WHERE session_id IN (SELECT id FROM s)) AS device_data,
+                            (SELECT COUNT(*) FROM geo_data WHERE session_id IN (SELECT id FROM s)) AS geo_data
+                        """,
+                        (user_id,)
+                    )
+                    
+                    counts['behavior_profiles'] = self.db.execute(
+                        "DELETE FROM behavior_profiles WHERE user_id = ?", (user_id,)
+                    )
+                    counts['behavior_sessions'] = self.db.execute(
+                        "DELETE FROM behavior_sessions WHERE user_id = ?", (user_id,)
+                    )
             
             logger.info(f"Deleted all behavioral data for user {user_id}")
             
             return {
-                'keystroke_data': keystroke_count,
-                'mouse_data': mouse_count,
-                'device_data': device_count,
-                'geo_data': geo_count,
-                'behavior_profiles': profile_count,
-                'behavior_sessions': session_count
+                'keystroke_data': counts['keystroke_data'],
+                'mouse_data': counts['mouse_data'],
+                'device_data': counts['device_data'],
+                'geo_data': counts['geo_data'],
+                'behavior_profiles': counts['behavior_profiles'],
+                'behavior_sessions': counts['behavior_sessions']
             }
             
         except Exception as e:
-            # Rollback transaction
-            self.db.rollback()
             logger.error(f"Error deleting behavioral data for user {user_id}: {e}")
             raise
\ No newline at end of file
@@ -1,12 +1,144 @@
 import os
+import io
+import re
+import csv
+import hashlib
+import functools
 import logging
 import sqlite3
+import threading
+import uuid
+import weakref
 import pymongo
 import psycopg2
-from typing import Dict, Any, Optional, Union, List, Tuple
+import psycopg2.extras
+import psycopg2.pool
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Union, List, Tuple, Iterable, Iterator, Sequence, Literal
 
 logger = logging.getLogger(__name__)
 
+# Table and column names are interpolated into SQL, so only plain identifiers are accepted
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Applied to every SQLite connection unless overridden by the 'sqlite_pragmas'
+# config key. WAL with synchronous=NORMAL avoids an fsync per commit while keeping
+# transactions atomic and lets readers proceed alongside a writer; busy_timeout
+# makes a writer wait for the lock instead of failing; SQLite ignores
+# ON DELETE CASCADE unless foreign keys are enabled.
+_SQLITE_PRAGMAS = (
+    "journal_mode = WAL",
+    "synchronous = NORMAL",
+    "busy_timeout = 5000",
+    "temp_store = MEMORY",
+    "mmap_size = 1073741824",
+    "cache_size = -65536",
+    "foreign_keys = ON",
+)
+
+# Per-connection prepared statement cache size (sqlite3 defaults to 128)
+_SQLITE_CACHED_STATEMENTS = 256
+
+def _check_identifiers(*names: str) -> None:
+    """Reject table or column names that are not plain SQL identifiers.
+    
+    Args:
+        names: Names that will be interpolated into SQL
+        
+    Raises:
+        ValueError: If a name is not a plain identifier
+    """
+    for name in names:
+        if not _IDENTIFIER_RE.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+# Statement text is memoized per shape, so repeated calls skip the string
+# building and hit sqlite3's prepared statement cache with identical SQL
+
+@functools.lru_cache(maxsize=256)
+def _insert_sql(table: str, columns: Tuple[str, ...]) -> str:
+    """Build the INSERT statement for a table and column shape."""
+    _check_identifiers(table, *columns)
+    placeholders = ', '.join(['?'] * len(columns))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+@functools.lru_cache(maxsize=256)
+def _update_sql(table: str, columns: Tuple[str, ...], condition: str) -> str:
+    """Build the UPDATE statement for a table, column shape and WHERE condition."""
+    _check_identifiers(table, *columns)
+    set_clause = ', '.join([f"{col} = ?" for col in columns])
+    return f"UPDATE {table} SET {set_clause} WHERE {condition}"
+
+@functools.lru_cache(maxsize=256)
+def _delete_sql(table: str, condition: str) -> str:
+    """Build the DELETE statement for a table and WHERE condition."""
+    _check_identifiers(table)
+    return f"DELETE FROM {table} WHERE {condition}"
+
+@dataclass(frozen=True)
+class Predicate:
+    """Single field comparison used as an update or delete condition.
+    
+    A list of predicates is combined with AND and rendered either as a SQL
+    WHERE fragment or as a MongoDB filter.
+    
+    Attributes:
+        field: Column or document field name
+        op: Comparison operator ('eq', 'ne', 'gt', 'lt', 'in' or 'like')
+        value: Value to compare against (a sequence for 'in')
+    """
+    field: str
+    op: Literal['eq', 'ne', 'gt', 'lt', 'in', 'like']
+    value: Any
+    
+    _SQL_OPERATORS = {'eq': '=', 'ne': '!=', 'gt': '>', 'lt': '<', 'like': 'LIKE'}
+    _MONGO_OPERATORS = {'ne': '$ne', 'gt': '$gt', 'lt': '$lt'}
+    
+    def __post_init__(self):
+        """Validate the field name and operator."""
+        _check_identifiers(self.field)
+        if self.op != 'in' and self.op not in self._SQL_OPERATORS:
+            raise ValueError(f"Unsupported predicate operator: {self.op}")
+    
+    def to_sql(self) -> Tuple[str, tuple]:
+        """Render the predicate as a SQL fragment.
+        
+        Returns:
+            Tuple of (fragment with ? placeholders, parameters)
+        """
+        if self.op == 'in':
+            values = tuple(self.value)
+            if not values:
+                return "1 = 0", ()
+            return f"{self.field} IN ({', '.join(['?'] * len(values))})", values
+        
+        if self.value is None and self.op in ('eq', 'ne'):
+            return f"{self.field} IS {'NOT ' if self.op == 'ne' else ''}NULL", ()
+        
+        return f"{self.field} {self._SQL_OPERATORS[self.op]} ?", (self.value,)
+    
+    def to_mongo(self) -> Dict[str, Any]:
+        """Render the predicate as a MongoDB filter.
+        
+        Returns:
+            MongoDB query dictionary
+        """
+        if self.op == 'eq':
+            return {self.field: self.value}
+        if self.op == 'in':
+            return {self.field: {'$in': list(self.value)}}
+        if self.op == 'like':
+            # Translate the LIKE wildcards and escape everything else
+            pattern = ''.join(
+                '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+                for char in self.value
+            )
+            return {self.field: {'$regex': f"^{pattern}$", '$options': 'i'}}
+        return {self.field: {self._MONGO_OPERATORS[self.op]: self.value}}
+
+Condition = Union[str, Sequence[Predicate]]
+
 class DatabaseManager:
     """Database manager for handling database connections and operations."""
     
@@ -18,8 +150,13 @@ class DatabaseManager:
         """
         self.config = config
         self.db_type = config.get('db_type', 'sqlite').lower()
-        self.connection = None
-        self.cursor = None
+        self.db_path = None
+        self._local = threading.local()
+        self._sqlite_connections: List[sqlite3.Connection] = []
+        self._sqlite_lock = threading.Lock()
+        self._pg_pool = None
+        self._pg_prepared = weakref.WeakKeyDictionary()
+        self._mongo_db = None
         
         # Connect to database
         self._connect()
@@ -30,12 +167,14 @@ class DatabaseManager:
         """Connect to the database based on configuration."""
         try:
             if self.db_type == 'sqlite':
-                db_path = self.config.get('db_path', 'biometric_auth.db')
-                self.connection = sqlite3.connect(db_path, check_same_thread=False)
-                self.connection.row_factory = sqlite3.Row
+                self.db_path = self.config.get('db_path', 'biometric_auth.db')
+                # Open the calling thread's connection now so bad paths fail early
+                self._sqlite_connection()
                 
             elif self.db_type == 'postgresql':
-                self.connection = psycopg2.connect(
+                self._pg_pool = psycopg2.pool.ThreadedConnectionPool(
+                    minconn=self.config.get('pool_min_size', 5),
+                    maxconn=self.config.get('pool_max_size', 50),
                     host=self.config.get('host', 'localhost'),
                     port=self.config.get('port', 5432),
                     database=self.config.get('database', 'biometric_auth'),
@@ -45,45 +184,135 @@ class DatabaseManager:
                 
             elif self.db_type == 'mongodb':
                 mongo_uri = self.config.get('uri', 'mongodb://localhost:27017')
-                client = pymongo.MongoClient(mongo_uri)
+                client = pymongo.MongoClient(mongo_uri, maxPoolSize=self.config.get('pool_max_size', 50))
                 db_name = self.config.get('database', 'biometric_auth')
-                self.connection = client[db_name]
+                self._mongo_db = client[db_name]
             
             else:
                 raise ValueError(f"Unsupported database type: {self.db_type}")
             
-            # Create cursor for SQL databases
-            if self.db_type in ['sqlite', 'postgresql']:
-                self.cursor = self.connection.cursor()
-            
             logger.info(f"Connected to {self.db_type} database")
             
         except Exception as e:
             logger.error(f"Error connecting to {self.db_type} database: {e}")
             raise
     
-    def execute(self, query: str, params: tuple = ()) -> Any:
+    def _sqlite_connection(self) -> sqlite3.Connection:
+        """Get the calling thread's SQLite connection, opening it on first use.
+        
+        Returns:
+            SQLite connection owned by the calling thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Only the owning thread uses the connection; close() may run on another one
+            # Autocommit mode: single statements commit on their own and
+            # transactions are opened explicitly with BEGIN
+            connection = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=_SQLITE_CACHED_STATEMENTS
+            )
+            connection.row_factory = sqlite3.Row
+            for pragma in self.config.get('sqlite_pragmas', _SQLITE_PRAGMAS):
+                connection.execute(f"PRAGMA {pragma}")
+            # ON DELETE CASCADE depends on it, so it is applied whatever the override
+            connection.execute("PRAGMA foreign_keys = ON")
+            
+            self._local.connection = connection
+            with self._sqlite_lock:
+                self._sqlite_connections.append(connection)
+        
+        return connection
+    
+    @contextmanager
+    def _conn(self) -> Iterator[Any]:
+        """Borrow a connection for the calling thread.
+        
+        SQLite yields the thread's own connection. PostgreSQL yields the
+        connection pinned by an open transaction, or otherwise checks one out
+        of the pool for the duration of the block; pooled connections run in
+        autocommit mode, so nothing is left pending when the connection is
+        handed back.
+        
+        Yields:
+            Database connection
+        """
+        if self.db_type == 'sqlite':
+            yield self._sqlite_connection()
+            return
+        
+        pinned = getattr(self._local, 'connection', None)
+        if pinned is not None:
+            yield pinned
+            return
+        
+        connection = self._pg_pool.getconn()
+        try:
+            if not connection.autocommit:
+                connection.autocommit = True
+            yield connection
+        finally:
+            self._pg_pool.putconn(connection)
+    
+    @property
+    def connection(self) -> Any:
+        """Connection for the calling thread.
+        
+        SQLite returns the thread's own connection and MongoDB the database
+        handle. PostgreSQL returns the connection pinned by an open
+        transaction, or None outside a transaction.
+        """
+        if self.db_type == 'sqlite':
+            return self._sqlite_connection()
+        if self.db_type == 'mongodb':
+            return self._mongo_db
+        return getattr(self._local, 'connection', None)
+    
+    def _dict_cursor(self, connection: Any) -> Any:
+        """Open a cursor whose rows can be read as dictionaries.
+        
+        PostgreSQL rows are built as dicts by RealDictCursor; SQLite rows are
+        sqlite3.Row objects from the connection's row factory.
+        
+        Args:
+            connection: Connection to open the cursor on
+            
+        Returns:
+            Database cursor
+        """
+        if self.db_type == 'postgresql':
+            return connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        return connection.cursor()
+    
+    def execute(self, query: str, params: tuple = ()) -> int:
         """Execute a SQL query.
         
+        The cursor is not returned, because on PostgreSQL its connection goes
+        back to the pool when the call ends; use fetch_one() or fetch_all()
+        for queries that return rows.
+        
         Args:
             query: SQL query string
             params: Query parameters
             
         Returns:
-            Query result
+            Number of rows affected (-1 if not applicable)
         """
         if self.db_type not in ['sqlite', 'postgresql']:
             raise ValueError(f"execute() not supported for {self.db_type} database")
         
-        try:
-            self.cursor.execute(query, params)
-            return self.cursor
-        except Exception as e:
-            logger.error(f"Error executing query: {e}\nQuery: {query}\nParams: {params}")
-            self.connection.rollback()
-            raise
+        with self._conn() as connection:
+            try:
+                cursor = connection.cursor()
+                cursor.execute(query, params)
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"Error executing query: {e}\nQuery: {query}\nParams: {params}")
+                raise
     
-    def execute_many(self, query: str, params_list: List[tuple]) -> Any:
+    def execute_many(self, query: str, params_list: List[tuple]) -> int:
         """Execute a SQL query with multiple parameter sets.
         
         Args:
@@ -91,19 +320,99 @@ class DatabaseManager:
             params_list: List of parameter tuples
             
         Returns:
-            Query result
+            Number of rows affected
         """
         if self.db_type not in ['sqlite', 'postgresql']:
             raise ValueError(f"execute_many() not supported for {self.db_type} database")
         
         try:
-            self.cursor.executemany(query, params_list)
-            return self.cursor
+            # Without a transaction each parameter set would commit on its own
+            with self.transaction(), self._conn() as connection:
+                cursor = connection.cursor()
+                cursor.executemany(query, params_list)
+                return cursor.rowcount
         except Exception as e:
             logger.error(f"Error executing query: {e}\nQuery: {query}")
-            self.connection.rollback()
             raise
     
+    def execute_script(self, statements: List[str]) -> None:
+        """Execute several parameterless SQL statements in one transaction.
+        
+        SQLite runs them as a single executescript call; PostgreSQL sends them
+        in one round trip, which the server runs as one implicit transaction.
+        Inside an explicit transaction the statements join it instead.
+        
+        Args:
+            statements: SQL statements without trailing semicolons
+        """
+        if self.db_type not in ['sqlite', 'postgresql']:
+            raise ValueError(f"execute_script() not supported for {self.db_type} database")
+        
+        script = ";\n".join(statements) + ";"
+        
+        with self._conn() as connection:
+            try:
+                if self.db_type == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute(script)
+                elif self._in_tx:
+                    # executescript() would commit the caller's transaction first
+                    cursor = connection.cursor()
+                    for statement in statements:
+                        cursor.execute(statement)
+                else:
+                    connection.executescript(f"BEGIN;\n{script}\nCOMMIT;")
+            except Exception as e:
+                logger.error(f"Error executing script: {e}\nScript: {script}")
+                if not self._in_tx:
+                    connection.rollback()
+                raise
+    
+    def bulk_copy(self, table: str, columns: List[str], rows: Iterable[tuple]) -> int:
+        """Bulk load rows into a table.
+        
+        PostgreSQL streams the rows through a single COPY FROM STDIN; SQLite
+        inserts them with executemany inside one transaction.
+        
+        Args:
+            table: Table name
+            columns: Column names, in the order of the row values
+            rows: Row value tuples
+            
+        Returns:
+            Number of rows loaded
+        """
+        if self.db_type not in ['sqlite', 'postgresql']:
+            raise ValueError(f"bulk_copy() not supported for {self.db_type} database")
+        
+        _check_identifiers(table, *columns)
+        columns_str = ', '.join(columns)
+        
+        with self._conn() as connection:
+            try:
+                if self.db_type == 'postgresql':
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    for row in rows:
+                        writer.writerow(['\\N' if value is None else value for value in row])
+                    buffer.seek(0)
+                    
+                    with connection.cursor() as cursor:
+                        cursor.copy_expert(
+                            f"COPY {table} ({columns_str}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                            buffer
+                        )
+                        return cursor.rowcount
+                    
+                else:
+                    return self._executemany_in_transaction(connection, table, columns, rows)
+                
+            except Exception as e:
+                logger.error(f"Error bulk loading into {table}: {e}")
+                if not self._in_tx:
+                    connection.rollback()
+                raise
+    
     def fetch_one(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """Execute a query and fetch one result.
         
@@ -117,22 +426,24 @@ class DatabaseManager:
         if self.db_type not in ['sqlite', 'postgresql']:
             raise ValueError(f"fetch_one() not supported for {self.db_type} database")
         
-        try:
-            self.cursor.execute(query, params)
-            row = self.cursor.fetchone()
-            
-            if row is None:
-                return None
-            
-            if self.db_type == 'sqlite':
-                return dict(row)
-            elif self.db_type == 'postgresql':
-                columns = [desc[0] for desc in self.cursor.description]
-                return dict(zip(columns, row))
-            
-        except Exception as e:
-            logger.error(f"Error fetching one row: {e}\nQuery: {query}\nParams: {params}")
-            raise
+        with self._conn() as connection:
+            cursor = self._dict_cursor(connection)
+            try:
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+                
+                if row is None:
+                    return None
+                
+                if self.db_type == 'sqlite':
+                    return dict(row)
+                return row
+                
+            except Exception as e:
+                logger.error(f"Error fetching one row: {e}\nQuery: {query}\nParams: {params}")
+                raise
+            finally:
+                cursor.close()
     
     def fetch_all(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute a query and fetch all results.
@@ -147,18 +458,115 @@ class DatabaseManager:
         if self.db_type not in ['sqlite', 'postgresql']:
             raise ValueError(f"fetch_all() not supported for {self.db_type} database")
         
+        with self._conn() as connection:
+            cursor = self._dict_cursor(connection)
+            try:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                
+                if self.db_type == 'sqlite':
+                    return [dict(row) for row in rows]
+                return rows
+                
+            except Exception as e:
+                logger.error(f"Error fetching all rows: {e}\nQuery: {query}\nParams: {params}")
+                raise
+            finally:
+                cursor.close()
+    
+    def stream(self, query: str, params: tuple = (), chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Execute a query and yield results one at a time.
+        
+        Rows are fetched in chunks on a dedicated cursor, so only one chunk is
+        held in memory and other queries can run while the caller iterates.
+        PostgreSQL uses a named server-side cursor, so the result set stays on
+        the server instead of being transferred in full by execute().
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            chunk_size: Number of rows fetched per round trip
+            
+        Yields:
+            Row results as dictionaries
+        """
+        if self.db_type not in ['sqlite', 'postgresql']:
+            raise ValueError(f"stream() not supported for {self.db_type} database")
+        
+        with self._conn() as connection:
+            in_tx = self._in_tx
+            if self.db_type == 'postgresql':
+                # Named cursors only work inside a transaction; inside the
+                # caller's explicit BEGIN, psycopg2 still sees autocommit and
+                # requires WITH HOLD
+                if not in_tx:
+                    connection.autocommit = False
+                cursor = connection.cursor(
+                    name=f"stream_{uuid.uuid4().hex}",
+                    cursor_factory=psycopg2.extras.RealDictCursor,
+                    withhold=in_tx
+                )
+            else:
+                cursor = connection.cursor()
+            
+            try:
+                cursor.execute(query, params)
+                
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    
+                    for row in rows:
+                        yield dict(row) if self.db_type == 'sqlite' else row
+                        
+            except Exception as e:
+                logger.error(f"Error streaming rows: {e}\nQuery: {query}\nParams: {params}")
+                raise
+            finally:
+                cursor.close()
+                if self.db_type == 'postgresql' and not in_tx:
+                    connection.rollback()
+                    connection.autocommit = True
+    
+    def open_blob(self, table: str, column: str, condition: Condition, params: tuple = ()) -> Optional[Any]:
+        """Open a single BLOB value for incremental reading.
+        
+        SQLite returns a read-only sqlite3.Blob over the stored value, so
+        callers can read() just the slice they need instead of copying the
+        whole BLOB into memory. Other databases fetch the value and wrap it in
+        an io.BytesIO with the same read/seek interface. The handle belongs to
+        the calling thread's connection and should be closed after use.
+        
+        Args:
+            table: Table name
+            column: BLOB column name
+            condition: Predicates combined with AND, or a raw SQL WHERE condition
+            params: Parameters for a raw SQL condition
+            
+        Returns:
+            File-like object over the BLOB, or None if no row matches
+        """
+        _check_identifiers(table, column)
+        
         try:
-            self.cursor.execute(query, params)
-            rows = self.cursor.fetchall()
+            if self.db_type == 'mongodb':
+                document = self._mongo_db[table].find_one(self._mongo_filter(condition), {column: 1})
+                return io.BytesIO(document[column]) if document else None
+            
+            condition, params = self._where(condition, params)
             
             if self.db_type == 'sqlite':
-                return [dict(row) for row in rows]
-            elif self.db_type == 'postgresql':
-                columns = [desc[0] for desc in self.cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+                row = self.fetch_one(f"SELECT rowid FROM {table} WHERE {condition} LIMIT 1", params)
+                if row is None:
+                    return None
+                return self._sqlite_connection().blobopen(table, column, row['rowid'], readonly=True)
+            
+            row = self.fetch_one(f"SELECT {column} FROM {table} WHERE {condition} LIMIT 1", params)
+            return io.BytesIO(bytes(row[column])) if row else None
             
         except Exception as e:
-            logger.error(f"Error fetching all rows: {e}\nQuery: {query}\nParams: {params}")
+            logger.error(f"Error opening BLOB {table}.{column}: {e}")
             raise
     
     def insert(self, table: str, data: Dict[str, Any]) -> Any:
@@ -173,47 +581,117 @@ class DatabaseManager:
         """
         if self.db_type == 'mongodb':
             try:
-                collection = self.connection[table]
+                collection = self._mongo_db[table]
                 result = collection.insert_one(data)
                 return result.inserted_id
             except Exception as e:
                 logger.error(f"Error inserting into MongoDB: {e}")
                 raise
         else:  # SQL databases
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?'] * len(data))
-            query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+            query = _insert_sql(table, tuple(data.keys()))
             
+            with self._conn() as connection:
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(self._statement(connection, query), tuple(data.values()))
+                    
+                    if self.db_type == 'sqlite':
+                        return cursor.lastrowid
+                    elif self.db_type == 'postgresql':
+                        return cursor.fetchone()[0]  # Assuming RETURNING id
+                except Exception as e:
+                    logger.error(f"Error inserting into {table}: {e}")
+                    raise
+    
+    def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """Insert multiple rows into a table in one transaction.
+        
+        Args:
+            table: Table name
+            rows: Data to insert as dictionaries sharing the same keys
+            
+        Returns:
+            Number of rows inserted
+        """
+        if not rows:
+            return 0
+        
+        if self.db_type == 'mongodb':
             try:
-                self.cursor.execute(query, tuple(data.values()))
-                self.connection.commit()
-                
-                if self.db_type == 'sqlite':
-                    return self.cursor.lastrowid
-                elif self.db_type == 'postgresql':
-                    return self.cursor.fetchone()[0]  # Assuming RETURNING id
+                collection = self._mongo_db[table]
+                result = collection.insert_many(rows)
+                return len(result.inserted_ids)
             except Exception as e:
-                logger.error(f"Error inserting into {table}: {e}")
-                self.connection.rollback()
+                logger.error(f"Error inserting many into MongoDB: {e}")
                 raise
+        else:  # SQL databases
+            columns = list(rows[0].keys())
+            values = [tuple(row[col] for col in columns) for row in rows]
+            
+            with self._conn() as connection:
+                try:
+                    if self.db_type == 'postgresql':
+                        with connection.cursor() as cursor:
+                            psycopg2.extras.execute_values(
+                                cursor,
+                                f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+                                values,
+                                page_size=len(values)
+                            )
+                        return len(values)
+                    
+                    return self._executemany_in_transaction(connection, table, columns, values)
+                    
+                except Exception as e:
+                    logger.error(f"Error inserting many into {table}: {e}")
+                    if not self._in_tx:
+                        connection.rollback()
+                    raise
+    
+    def _executemany_in_transaction(self, connection: sqlite3.Connection, table: str,
+                                    columns: List[str], rows: Iterable[tuple]) -> int:
+        """Insert rows into a SQLite table with executemany in one transaction.
+        
+        Joins the caller's transaction if one is already open.
+        
+        Args:
+            connection: SQLite connection to insert on
+            table: Table name
+            columns: Column names, in the order of the row values
+            rows: Row value tuples
+            
+        Returns:
+            Number of rows inserted
+        """
+        query = _insert_sql(table, tuple(columns))
+        
+        owns_transaction = not connection.in_transaction
+        cursor = connection.cursor()
+        if owns_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany(query, rows)
+        if owns_transaction:
+            connection.commit()
+        
+        return cursor.rowcount
     
-    def update(self, table: str, data: Dict[str, Any], condition: str, params: tuple) -> int:
+    def update(self, table: str, data: Dict[str, Any], condition: Condition, params: tuple = ()) -> int:
         """Update data in a table.
         
         Args:
             table: Table name
             data: Data to update as dictionary
-            condition: WHERE condition
-            params: Condition parameters
+            condition: Predicates combined with AND, or a raw SQL WHERE condition
+            params: Parameters for a raw SQL condition
             
         Returns:
             Number of rows affected
         """
         if self.db_type == 'mongodb':
             try:
-                collection = self.connection[table]
+                collection = self._mongo_db[table]
                 result = collection.update_one(
-                    self._parse_mongo_condition(condition, params),
+                    self._mongo_filter(condition),
                     {'$set': data}
                 )
                 return result.modified_count
@@ -221,72 +699,164 @@ class DatabaseManager:
                 logger.error(f"Error updating MongoDB: {e}")
                 raise
         else:  # SQL databases
-            set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
-            query = f"UPDATE {table} SET {set_clause} WHERE {condition}"
+            condition, params = self._where(condition, params)
+            query = _update_sql(table, tuple(data.keys()), condition)
             
-            try:
-                self.cursor.execute(query, tuple(data.values()) + params)
-                self.connection.commit()
-                return self.cursor.rowcount
-            except Exception as e:
-                logger.error(f"Error updating {table}: {e}")
-                self.connection.rollback()
-                raise
+            with self._conn() as connection:
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(self._statement(connection, query), tuple(data.values()) + params)
+                    return cursor.rowcount
+                except Exception as e:
+                    logger.error(f"Error updating {table}: {e}")
+                    raise
     
-    def delete(self, table: str, condition: str, params: tuple) -> int:
+    def delete(self, table: str, condition: Condition, params: tuple = ()) -> int:
         """Delete data from a table.
         
         Args:
             table: Table name
-            condition: WHERE condition
-            params: Condition parameters
+            condition: Predicates combined with AND, or a raw SQL WHERE condition
+            params: Parameters for a raw SQL condition
             
         Returns:
             Number of rows affected
         """
         if self.db_type == 'mongodb':
             try:
-                collection = self.connection[table]
+                collection = self._mongo_db[table]
                 result = collection.delete_many(
-                    self._parse_mongo_condition(condition, params)
+                    self._mongo_filter(condition)
                 )
                 return result.deleted_count
             except Exception as e:
                 logger.error(f"Error deleting from MongoDB: {e}")
                 raise
         else:  # SQL databases
-            query = f"DELETE FROM {table} WHERE {condition}"
+            condition, params = self._where(condition, params)
+            query = _delete_sql(table, condition)
+            
+            with self._conn() as connection:
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(self._statement(connection, query), params)
+                    return cursor.rowcount
+                except Exception as e:
+                    logger.error(f"Error deleting from {table}: {e}")
+                    raise
+    
+    def delete_many(self, table: str, column: str, values: Sequence[Any], chunk_size: int = 500) -> int:
+        """Delete every row whose column matches one of the given values.
+        
+        SQLite deletes in chunks of IN lists, staying under the bound
+        parameter limit; PostgreSQL joins against a single VALUES list. Either
+        way the rows are deleted in one transaction.
+        
+        Args:
+            table: Table name
+            column: Column to match
+            values: Values to delete
+            chunk_size: Maximum values per IN list (SQLite)
             
+        Returns:
+            Number of rows affected
+        """
+        if not values:
+            return 0
+        
+        if self.db_type == 'mongodb':
             try:
-                self.cursor.execute(query, params)
-                self.connection.commit()
-                return self.cursor.rowcount
+                collection = self._mongo_db[table]
+                result = collection.delete_many(Predicate(column, 'in', values).to_mongo())
+                return result.deleted_count
             except Exception as e:
-                logger.error(f"Error deleting from {table}: {e}")
-                self.connection.rollback()
+                logger.error(f"Error deleting many from MongoDB: {e}")
                 raise
+        
+        _check_identifiers(table, column)
+        
+        try:
+            with self.transaction():
+                if self.db_type == 'postgresql':
+                    with self._conn() as connection, connection.cursor() as cursor:
+                        psycopg2.extras.execute_values(
+                            cursor,
+                            f"DELETE FROM {table} USING (VALUES %s) AS v(value) WHERE {table}.{column} = v.value",
+                            [(value,) for value in values],
+                            page_size=len(values)
+                        )
+                        return cursor.rowcount
+                
+                deleted = 0
+                for start in range(0, len(values), chunk_size):
+                    deleted += self.delete(table, [Predicate(column, 'in', values[start:start + chunk_size])])
+                return deleted
+            
+        except Exception as e:
+            logger.error(f"Error deleting many from {table}: {e}")
+            raise
     
-    def create_table(self, table: str, schema: str) -> None:
+    def _statement(self, connection: Any, query: str) -> str:
+        """Get the statement to run for built SQL on a connection.
+        
+        SQLite reuses its prepared statements by SQL text, so the query is
+        returned unchanged. PostgreSQL prepared statements belong to a single
+        connection, so the query is prepared on each pooled connection the
+        first time it runs there and an EXECUTE is returned.
+        
+        Args:
+            connection: Connection the statement will run on
+            query: SQL query string with ? placeholders
+            
+        Returns:
+            Statement taking the original parameters
+        """
+        if self.db_type != 'postgresql':
+            return query
+        
+        prepared = self._pg_prepared.setdefault(connection, {})
+        statement = prepared.get(query)
+        if statement is None:
+            param_count = query.count('?')
+            counter = iter(range(1, param_count + 1))
+            server_query = re.sub(r'\?', lambda _: f"${next(counter)}", query)
+            name = f"stmt_{hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]}"
+            
+            with connection.cursor() as cursor:
+                cursor.execute(f"PREPARE {name} AS {server_query}")
+            
+            if param_count == 0:
+                statement = f"EXECUTE {name}"
+            else:
+                statement = f"EXECUTE {name} ({', '.join(['%s'] * param_count)})"
+            prepared[query] = statement
+        
+        return statement
+    
+    def create_table(self, table: str, schema: str, without_rowid: bool = False) -> None:
         """Create a table if it doesn't exist.
         
         Args:
             table: Table name
             schema: Table schema
+            without_rowid: Store the table clustered on its primary key (SQLite
+                only; ignored by other databases)
         """
         if self.db_type == 'mongodb':
             # MongoDB creates collections automatically
             return
         else:  # SQL databases
             query = f"CREATE TABLE IF NOT EXISTS {table} ({schema})"
+            if without_rowid and self.db_type == 'sqlite':
+                query += " WITHOUT ROWID"
             
-            try:
-                self.cursor.execute(query)
-                self.connection.commit()
-                logger.info(f"Table {table} created or already exists")
-            except Exception as e:
-                logger.error(f"Error creating table {table}: {e}")
-                self.connection.rollback()
-                raise
+            with self._conn() as connection:
+                try:
+                    connection.cursor().execute(query)
+                    logger.info(f"Table {table} created or already exists")
+                except Exception as e:
+                    logger.error(f"Error creating table {table}: {e}")
+                    raise
     
     def create_index(self, table: str, columns: List[str], index_name: Optional[str] = None, unique: bool = False) -> None:
         """Create an index on a table.
@@ -299,7 +869,7 @@ class DatabaseManager:
         """
         if self.db_type == 'mongodb':
             try:
-                collection = self.connection[table]
+                collection = self._mongo_db[table]
                 index_spec = [(col, pymongo.ASCENDING) for col in columns]
                 collection.create_index(index_spec, unique=unique)
                 logger.info(f"Index created on {table} for columns {columns}")
@@ -314,83 +884,241 @@ class DatabaseManager:
             columns_str = ', '.join(columns)
             query = f"CREATE {unique_str}INDEX IF NOT EXISTS {index_name} ON {table} ({columns_str})"
             
-            try:
-                self.cursor.execute(query)
-                self.connection.commit()
-                logger.info(f"Index {index_name} created on {table}")
-            except Exception as e:
-                logger.error(f"Error creating index on {table}: {e}")
-                self.connection.rollback()
-                raise
+            with self._conn() as connection:
+                try:
+                    connection.cursor().execute(query)
+                    logger.info(f"Index {index_name} created on {table}")
+                except Exception as e:
+                    logger.error(f"Error creating index on {table}: {e}")
+                    raise
+    
+    def drop_column(self, table: str, column: str, schema: str) -> None:
+        """Drop a column from a table if the table still has it.
+        
+        PostgreSQL drops the column together with the constraints and indexes
+        that use it. SQLite cannot drop a column that a foreign key or index
+        uses, so the table is rebuilt from its new definition in one
+        transaction and the remaining columns are copied across; indexes must
+        be created again afterwards.
+        
+        Args:
+            table: Table name
+            column: Column to drop
+            schema: Table schema without the column (used by SQLite only)
+        """
+        if self.db_type == 'mongodb':
+            # Collections have no fixed schema
+            return
+        
+        _check_identifiers(table, column)
+        
+        try:
+            if self.db_type == 'postgresql':
+                with self._conn() as connection, connection.cursor() as cursor:
+                    cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {column}")
+                return
+            
+            with self._conn() as connection:
+                columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                return
+            
+            rebuilt = f"{table}_rebuild"
+            with self.transaction(), self._conn() as connection:
+                cursor = connection.cursor()
+                cursor.execute(f"CREATE TABLE {rebuilt} ({schema})")
+                kept = ', '.join(
+                    row[1] for row in cursor.execute(f"PRAGMA table_info({rebuilt})") if row[1] in columns
+                )
+                cursor.execute(f"INSERT INTO {rebuilt} ({kept}) SELECT {kept} FROM {table}")
+                cursor.execute(f"DROP TABLE {table}")
+                cursor.execute(f"ALTER TABLE {rebuilt} RENAME TO {table}")
+            
+            logger.info(f"Column {column} dropped from {table}")
+        
+        except Exception as e:
+            logger.error(f"Error dropping column {column} from {table}: {e}")
+            raise
+    
+    @property
+    def _in_tx(self) -> bool:
+        """Whether the calling thread has an explicit transaction open."""
+        return getattr(self._local, 'tx_depth', 0) > 0
+    
+    def _execute_control(self, statement: str) -> None:
+        """Run a transaction control statement on the calling thread's connection.
+        
+        Args:
+            statement: BEGIN, COMMIT, ROLLBACK or SAVEPOINT statement
+        """
+        with self._conn() as connection:
+            connection.cursor().execute(statement)
+    
+    def _end_transaction(self, depth: int) -> None:
+        """Pop one transaction level, releasing a pinned connection at the outermost one.
+        
+        Args:
+            depth: Transaction depth before the commit or rollback
+        """
+        if depth == 0:
+            return
+        
+        self._local.tx_depth = depth - 1
+        if depth == 1 and self.db_type == 'postgresql':
+            connection = self._local.connection
+            self._local.connection = None
+            self._pg_pool.putconn(connection)
     
     def begin_transaction(self) -> None:
-        """Begin a transaction."""
+        """Begin a transaction.
+        
+        Operations on the calling thread join the transaction until it is
+        committed or rolled back. Beginning again inside a transaction opens
+        a savepoint.
+        """
         if self.db_type in ['sqlite', 'postgresql']:
-            self.connection.begin()
+            depth = getattr(self._local, 'tx_depth', 0)
+            
+            if depth > 0:
+                self._execute_control(f"SAVEPOINT sp_{depth}")
+            else:
+                if self.db_type == 'postgresql':
+                    # Pin a pooled connection to this thread until the transaction ends
+                    connection = self._pg_pool.getconn()
+                    connection.autocommit = True
+                    self._local.connection = connection
+                try:
+                    self._execute_control("BEGIN")
+                except Exception:
+                    self._end_transaction(1)
+                    raise
+            
+            self._local.tx_depth = depth + 1
             logger.debug("Transaction started")
     
     def commit(self) -> None:
-        """Commit the current transaction."""
+        """Commit the current transaction, or release the innermost savepoint."""
         if self.db_type in ['sqlite', 'postgresql']:
-            self.connection.commit()
+            depth = getattr(self._local, 'tx_depth', 0)
+            try:
+                if depth > 1:
+                    self._execute_control(f"RELEASE SAVEPOINT sp_{depth - 1}")
+                elif self.db_type == 'sqlite':
+                    self._sqlite_connection().commit()
+                elif depth == 1:
+                    self._execute_control("COMMIT")
+            finally:
+                self._end_transaction(depth)
             logger.debug("Transaction committed")
     
     def rollback(self) -> None:
-        """Rollback the current transaction."""
+        """Rollback the current transaction, or to the innermost savepoint."""
         if self.db_type in ['sqlite', 'postgresql']:
-            self.connection.rollback()
+            depth = getattr(self._local, 'tx_depth', 0)
+            try:
+                if depth > 1:
+                    self._execute_control(f"ROLLBACK TO SAVEPOINT sp_{depth - 1}")
+                    self._execute_control(f"RELEASE SAVEPOINT sp_{depth - 1}")
+                elif self.db_type == 'sqlite':
+                    self._sqlite_connection().rollback()
+                elif depth == 1:
+                    self._execute_control("ROLLBACK")
+            finally:
+                self._end_transaction(depth)
             logger.debug("Transaction rolled back")
     
+    @contextmanager
+    def transaction(self) -> Iterator['DatabaseManager']:
+        """Run a block of operations in one transaction.
+        
+        Commits when the block completes and rolls back if it raises. Nested
+        blocks use savepoints.
+        
+        Yields:
+            This database manager
+        """
+        self.begin_transaction()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        else:
+            self.commit()
+    
+    def __enter__(self) -> 'DatabaseManager':
+        """Begin a transaction for a ``with`` block."""
+        self.begin_transaction()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        """Commit the transaction, or roll it back if the block raised."""
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+    
     def close(self) -> None:
-        """Close the database connection."""
-        if self.db_type in ['sqlite', 'postgresql'] and self.connection:
-            self.connection.close()
-            logger.info("Database connection closed")
-        elif self.db_type == 'mongodb' and hasattr(self.connection, 'client'):
-            self.connection.client.close()
+        """Close all database connections."""
+        if self.db_type == 'sqlite':
+            with self._sqlite_lock:
+                for connection in self._sqlite_connections:
+                    connection.close()
+                self._sqlite_connections.clear()
+            self._local = threading.local()
+            logger.info("Database connections closed")
+        elif self.db_type == 'postgresql' and self._pg_pool:
+            self._pg_pool.closeall()
+            logger.info("Database connection pool closed")
+        elif self.db_type == 'mongodb' and self._mongo_db is not None:
+            self._mongo_db.client.close()
             logger.info("MongoDB connection closed")
     
-    def _parse_mongo_condition(self, condition: str, params: tuple) -> Dict[str, Any]:
-        """Parse SQL-like condition to MongoDB query.
+    def _where(self, condition: Condition, params: tuple) -> Tuple[str, tuple]:
+        """Render a condition as a SQL WHERE fragment.
+        
+        Args:
+            condition: Predicates combined with AND, or a raw SQL WHERE condition
+            params: Parameters for a raw SQL condition
+            
+        Returns:
+            Tuple of (WHERE fragment, parameters)
+            
+        Raises:
+            ValueError: If no predicates are given
+        """
+        if isinstance(condition, str):
+            return condition, params
+        if not condition:
+            raise ValueError("At least one predicate is required")
+        
+        fragments = []
+        values = []
+        for predicate in condition:
+            fragment, args = predicate.to_sql()
+            fragments.append(fragment)
+            values.extend(args)
         
-        This is a simple implementation that handles basic conditions.
-        For complex queries, use MongoDB's native query syntax directly.
+        return ' AND '.join(fragments), tuple(values)
+    
+    def _mongo_filter(self, condition: Condition) -> Dict[str, Any]:
+        """Render a condition as a MongoDB filter.
         
         Args:
-            condition: SQL-like condition string (e.g., "id = ?")
-            params: Condition parameters
+            condition: Predicates combined with AND
             
         Returns:
             MongoDB query dictionary
+            
+        Raises:
+            ValueError: If the condition is a raw SQL string or empty
         """
-        # Very basic implementation - in a real system, use a proper SQL parser
-        mongo_query = {}
-        
-        # Handle simple equality conditions
-        if '=' in condition and '!=' not in condition and '<' not in condition and '>' not in condition:
-            field = condition.split('=')[0].strip()
-            mongo_query[field] = params[0]
-        elif 'IN' in condition.upper():
-            # Handle IN conditions
-            field = condition.split('IN')[0].strip()
-            mongo_query[field] = {'$in': list(params)}
-        else:
-            # For more complex conditions, log a warning
-            logger.warning(f"Complex condition '{condition}' might not be correctly translated to MongoDB query")
-            # Attempt a basic translation for common operators
-            if '!=' in condition:
-                field = condition.split('!=')[0].strip()
-                mongo_query[field] = {'$ne': params[0]}
-            elif '>' in condition:
-                field = condition.split('>')[0].strip()
-                mongo_query[field] = {'$gt': params[0]}
-            elif '<' in condition:
-                field = condition.split('<')[0].strip()
-                mongo_query[field] = {'$lt': params[0]}
-            elif 'LIKE' in condition.upper():
-                field = condition.split('LIKE')[0].strip()
-                # Convert SQL LIKE pattern to regex
-                pattern = params[0].replace('%', '.*')
-                mongo_query[field] = {'$regex': pattern, '$options': 'i'}
-        
-        return mongo_query
\ No newline at end of file
+        if isinstance(condition, str):
+            raise ValueError("MongoDB conditions must be given as Predicate objects")
+        if not condition:
+            raise ValueError("At least one predicate is required")
+        
+        if len(condition) == 1:
+            return condition[0].to_mongo()
+        return {'$and': [predicate.to_mongo() for predicate in condition]}
\ No newline at end of file
@@ -18,10 +18,12 @@ class DatabaseSchema:
     
     def create_all_tables(self) -> None:
         """Create all database tables if they don't exist."""
-        self._create_users_table()
-        self._create_biometric_data_tables()
-        self._create_behavioral_data_tables()
-        self._create_anomaly_data_tables()
+        # One transaction, so the whole schema is written with a single commit
+        with self.db.transaction():
+            self._create_users_table()
+            self._create_biometric_data_tables()
+            self._create_behavioral_data_tables()
+            self._create_anomaly_data_tables()
         logger.info("All database tables created successfully")
     
     def _create_users_table(self) -> None:
@@ -144,39 +146,31 @@ class DatabaseSchema:
         )
         
         # Keystroke data table
-        self.db.create_table(
-            'keystroke_data',
-            """
+        keystroke_schema = """
             id TEXT PRIMARY KEY,
             session_id TEXT NOT NULL,
-            user_id TEXT NOT NULL,
             key_code TEXT NOT NULL,
             event_type TEXT NOT NULL,
             timestamp INTEGER NOT NULL,
             duration INTEGER,
             pressure REAL,
-            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE
             """
-        )
+        self.db.create_table('keystroke_data', keystroke_schema)
         
         # Mouse data table
-        self.db.create_table(
-            'mouse_data',
-            """
+        mouse_schema = """
             id TEXT PRIMARY KEY,
             session_id TEXT NOT NULL,
-            user_id TEXT NOT NULL,
             event_type TEXT NOT NULL,
             x INTEGER NOT NULL,
             y INTEGER NOT NULL,
             timestamp INTEGER NOT NULL,
             button TEXT,
             scroll_delta INTEGER,
-            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            FOREIGN KEY (session_id) REFERENCES behavior_sessions(id) ON DELETE CASCADE
             """
-        )
+        self.db.create_table('mouse_data', mouse_schema)
         
         # Device data table
         self.db.create_table(
@@ -230,6 +224,21 @@ class DatabaseSchema:
             """
         )
         
+        # Tables created before user_id was dropped still have it as NOT NULL,
+        # which every insert would now violate
+        self.db.drop_column('keystroke_data', 'user_id', keystroke_schema)
+        self.db.drop_column('mouse_data', 'user_id', mouse_schema)
+        
+        # Index the lookup columns and every foreign key that cascades deletes
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_behavior_sessions_user_started ON behavior_sessions(user_id, started_at DESC)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_keystroke_data_session ON keystroke_data(session_id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_mouse_data_session ON mouse_data(session_id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_device_data_session ON device_data(session_id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_device_data_user ON device_data(user_id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_geo_data_session ON geo_data(session_id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_geo_data_user ON geo_data(user_id)")
+        self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_behavioral_profiles_user_type ON behavioral_profiles(user_id, profile_type)")
+        
         logger.info("Behavioral data tables created successfully")
     
     def _create_anomaly_data_tables(self) -> None:
@@ -286,7 +295,6 @@ class DatabaseSchema:
             'biometric_profiles', 'users'
         ]
         
-        for table in tables:
-            self.db.execute(f"DROP TABLE IF EXISTS {table}")
+        self.db.execute_script([f"DROP TABLE IF EXISTS {table}" for table in tables])
         
         logger.info("All database tables dropped successfully")
\ No newline at end of file
@@ -2,15 +2,92 @@ import os
 import logging
 import json
 import time
-import uuid
 import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 
-from .db_manager import DatabaseManager
+import argon2
+from argon2.low_level import Type, hash_secret
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from .db_manager import DatabaseManager, Predicate
+from ..utils.cache import LRUCache
+from ..utils.helpers import generate_ulid
 
 logger = logging.getLogger(__name__)
 
+
+class LoginRateLimitError(Exception):
+    """Raised when a user and client have exceeded their login attempt rate."""
+
+
+# Argon2id cost parameters for password hashes
+ARGON2_TIME_COST = 3
+ARGON2_MEMORY_COST = 65536  # KiB
+ARGON2_PARALLELISM = 1
+ARGON2_HASH_LEN = 32
+ARGON2_SALT_LEN = 32  # bytes, matching the hex salts stored per user
+
+_PASSWORD_HASHER = argon2.PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM,
+    hash_len=ARGON2_HASH_LEN,
+    salt_len=ARGON2_SALT_LEN,
+    type=Type.ID
+)
+
+# Password hashing runs on a shared pool sized to the CPU count. argon2-cffi and
+# hashlib release the GIL, so hashes from concurrent logins run in parallel while
+# the number in flight (each Argon2 hash holds ARGON2_MEMORY_COST KiB) stays bounded.
+_KDF_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='kdf')
+
+# Prefix of Zstandard-compressed biometric data: magic with format version,
+# followed by a zstd frame that records its own uncompressed size
+_BIOMETRIC_ZSTD_MAGIC = b'BZS\x01'
+BIOMETRIC_ZSTD_LEVEL = 3
+
+# User columns that are safe to return to callers (everything but the hash and salt)
+USER_PUBLIC_COLS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'role', 'created_at',
+    'updated_at', 'last_login', 'login_attempts', 'locked_until', 'active'
+)
+_USER_PUBLIC_SELECT = ', '.join(USER_PUBLIC_COLS)
+_USER_AUTH_SELECT = ', '.join(USER_PUBLIC_COLS + ('password_hash', 'salt'))
+
+# Hot-path queries built once so every call passes the same SQL string to the
+# driver's statement cache
+_SQL_PUBLIC_USER_BY = {
+    column: f"SELECT {_USER_PUBLIC_SELECT} FROM users WHERE {column} = ?"
+    for column in ('id', 'username', 'email')
+}
+# Only the password paths select the hash and salt
+_SQL_VERIFY_USER = (
+    f"SELECT {_USER_AUTH_SELECT} FROM users "
+    "WHERE username = ? AND active = 1 AND (locked_until IS NULL OR locked_until < ?)"
+)
+_SQL_USER_CREDENTIALS_BY_ID = f"SELECT {_USER_AUTH_SELECT} FROM users WHERE id = ?"
+_SQL_GET_SESSION = "SELECT * FROM user_sessions WHERE token = ? AND expires_at > ? AND revoked = 0"
+
+# Bound on the in-process cache of public user rows. The TTL caps how long a
+# change made by another process (such as deactivating the user) can go unseen.
+# Sessions and password hashes are never cached, so revocations and password
+# changes take effect everywhere immediately.
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 30  # seconds
+
+# Login attempt buckets kept per (user, client) before the least recently used are dropped
+LOGIN_BUCKET_CACHE_SIZE = 10000
+
 class UserRepository:
     """Repository for user data storage and retrieval."""
     
@@ -22,6 +99,15 @@ class UserRepository:
         """
         self.db = db_manager
         
+        # Public user rows keyed by (column, value)
+        self._user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+        
+        # Token buckets throttling password attempts, keyed by (user ID, client)
+        self._login_buckets = LRUCache(maxsize=LOGIN_BUCKET_CACHE_SIZE)
+        self._login_bucket_lock = threading.Lock()
+        self._login_rate_burst = int(os.environ.get('LOGIN_RATE_BURST', '10'))
+        self._login_refill_per_second = int(os.environ.get('LOGIN_RATE_PER_MINUTE', '10')) / 60
+        
         # Initialize database tables
         self._init_tables()
         
@@ -64,28 +150,30 @@ class UserRepository:
             """
         )
         
-        # User sessions table
+        # User sessions table, clustered on the token every lookup filters by
         self.db.create_table(
             'user_sessions',
             """
-            id TEXT PRIMARY KEY,
+            token TEXT PRIMARY KEY,
+            id TEXT NOT NULL,
             user_id TEXT NOT NULL,
-            token TEXT NOT NULL,
             device_info TEXT,
             ip_address TEXT,
             created_at INTEGER NOT NULL,
             expires_at INTEGER NOT NULL,
             revoked BOOLEAN DEFAULT 0,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            """
+            """,
+            without_rowid=True
         )
         
         # Create indexes
         self.db.create_index('users', ['username'], unique=True)
         self.db.create_index('users', ['email'], unique=True)
-        self.db.create_index('user_biometrics', ['user_id', 'biometric_type'])
+        self.db.create_index('users', ['created_at'])
+        self.db.create_index('user_biometrics', ['user_id', 'biometric_type'], unique=True)
         self.db.create_index('user_sessions', ['user_id'])
-        self.db.create_index('user_sessions', ['token'], unique=True)
+        self.db.create_index('user_sessions', ['expires_at'])
         
         logger.info("User tables initialized")
     
@@ -99,10 +187,10 @@ class UserRepository:
             User ID
         """
         # Generate user ID
-        user_id = str(uuid.uuid4())
+        user_id = generate_ulid()
         
         # Generate salt and hash password
-        salt = os.urandom(32).hex()
+        salt = secrets.token_hex(ARGON2_SALT_LEN)
         password_hash = self._hash_password(user_data['password'], salt)
         
         # Prepare user data
@@ -139,14 +227,7 @@ class UserRepository:
             User data or None if not found
         """
         try:
-            user = self.db.fetch_one("SELECT * FROM users WHERE id = ?", (user_id,))
-            
-            if user:
-                # Remove sensitive data
-                user.pop('password_hash', None)
-                user.pop('salt', None)
-            
-            return user
+            return self._lookup_user('id', user_id)
         except Exception as e:
             logger.error(f"Error getting user {user_id}: {e}")
             raise
@@ -161,7 +242,7 @@ class UserRepository:
             User data or None if not found
         """
         try:
-            return self.db.fetch_one("SELECT * FROM users WHERE username = ?", (username,))
+            return self._lookup_user('username', username)
         except Exception as e:
             logger.error(f"Error getting user by username {username}: {e}")
             raise
@@ -176,7 +257,7 @@ class UserRepository:
             User data or None if not found
         """
         try:
-            return self.db.fetch_one("SELECT * FROM users WHERE email = ?", (email,))
+            return self._lookup_user('email', email)
         except Exception as e:
             logger.error(f"Error getting user by email {email}: {e}")
             raise
@@ -201,7 +282,8 @@ class UserRepository:
         user_data['updated_at'] = int(time.time())
         
         try:
-            rows_affected = self.db.update('users', user_data, "id = ?", (user_id,))
+            rows_affected = self.db.update('users', user_data, [Predicate('id', 'eq', user_id)])
+            self._invalidate_user(user_id)
             return rows_affected > 0
         except Exception as e:
             logger.error(f"Error updating user {user_id}: {e}")
@@ -217,56 +299,78 @@ class UserRepository:
             True if successful, False otherwise
         """
         try:
-            rows_affected = self.db.delete('users', "id = ?", (user_id,))
+            rows_affected = self.db.delete('users', [Predicate('id', 'eq', user_id)])
+            self._invalidate_user(user_id)
             return rows_affected > 0
         except Exception as e:
             logger.error(f"Error deleting user {user_id}: {e}")
             raise
     
-    def verify_password(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+    def verify_password(self, username: str, password: str,
+                        client_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Verify user password.
         
+        Attempts are rate limited per user and client (see _take_login_token).
+        Without a client_id all callers share the user's bucket, so anyone who
+        keeps guessing a username also blocks its owner's logins; pass the
+        client address to confine throttling to the guessing client.
+        
         Args:
             username: Username
             password: Password to verify
+            client_id: Client identifier, such as its IP address (optional)
             
         Returns:
             User data if password is correct, None otherwise
+            
+        Raises:
+            LoginRateLimitError: If the user and client have exceeded their
+                login attempt rate; the password is not checked
         """
         try:
-            user = self.db.fetch_one(
-                "SELECT * FROM users WHERE username = ? AND active = 1 AND (locked_until IS NULL OR locked_until < ?)",
-                (username, int(time.time()))
-            )
+            user = self.db.fetch_one(_SQL_VERIFY_USER, (username, int(time.time())))
             
             if not user:
                 return None
             
-            # Verify password
-            password_hash = self._hash_password(password, user['salt'])
+            # Throttle after the lookup, so only existing users get buckets, but
+            # before the KDF so hammered accounts never reach it
+            bucket_key = (user['id'], client_id)
+            if not self._take_login_token(bucket_key):
+                logger.warning(f"Login rate limit exceeded for {username}")
+                raise LoginRateLimitError(f"Too many login attempts for {username}")
             
-            if password_hash == user['password_hash']:
-                # Reset login attempts on successful login
-                self.db.update(
-                    'users',
-                    {
-                        'login_attempts': 0,
-                        'last_login': int(time.time())
-                    },
-                    "id = ?",
-                    (user['id'],)
-                )
+            # Verify password
+            if self._check_password(password, user):
+                # Refill the client's bucket and reset login attempts on successful login
+                with self._login_bucket_lock:
+                    self._login_buckets.pop(bucket_key)
+                update_data = {
+                    'login_attempts': 0,
+                    'last_login': int(time.time())
+                }
                 
-                # Remove sensitive data
-                user.pop('password_hash', None)
-                user.pop('salt', None)
+                # Upgrade legacy PBKDF2 hashes now that the password is known
+                if self._needs_rehash(user['password_hash']):
+                    update_data['salt'] = secrets.token_hex(ARGON2_SALT_LEN)
+                    update_data['password_hash'] = self._hash_password(password, update_data['salt'])
+                
+                # Write and read back the updated public row in one statement
+                set_clause = ', '.join(f"{col} = ?" for col in update_data)
+                updated = self.db.fetch_one(
+                    f"UPDATE users SET {set_clause} WHERE id = ? RETURNING {_USER_PUBLIC_SELECT}",
+                    (*update_data.values(), user['id'])
+                )
+                self._invalidate_user(user['id'])
                 
-                return user
+                return updated
             else:
                 # Increment login attempts
-                self._increment_login_attempts(user['id'], user['login_attempts'])
+                self._increment_login_attempts(user['id'])
                 return None
             
+        except LoginRateLimitError:
+            raise
         except Exception as e:
             logger.error(f"Error verifying password for {username}: {e}")
             raise
@@ -283,19 +387,18 @@ class UserRepository:
             True if successful, False otherwise
         """
         try:
-            user = self.db.fetch_one("SELECT * FROM users WHERE id = ?", (user_id,))
+            # Read the hash from the database, never from a cache
+            user = self.db.fetch_one(_SQL_USER_CREDENTIALS_BY_ID, (user_id,))
             
             if not user:
                 return False
             
             # Verify current password
-            current_hash = self._hash_password(current_password, user['salt'])
-            
-            if current_hash != user['password_hash']:
+            if not self._check_password(current_password, user):
                 return False
             
             # Generate new salt and hash
-            new_salt = os.urandom(32).hex()
+            new_salt = secrets.token_hex(ARGON2_SALT_LEN)
             new_hash = self._hash_password(new_password, new_salt)
             
             # Update password
@@ -306,9 +409,9 @@ class UserRepository:
                     'salt': new_salt,
                     'updated_at': int(time.time())
                 },
-                "id = ?",
-                (user_id,)
+                [Predicate('id', 'eq', user_id)]
             )
+            self._invalidate_user(user_id)
             
             return rows_affected > 0
             
@@ -327,13 +430,13 @@ class UserRepository:
             True if successful, False otherwise
         """
         try:
-            user = self.db.fetch_one("SELECT * FROM users WHERE id = ?", (user_id,))
+            user = self._lookup_user('id', user_id)
             
             if not user:
                 return False
             
             # Generate new salt and hash
-            new_salt = os.urandom(32).hex()
+            new_salt = secrets.token_hex(ARGON2_SALT_LEN)
             new_hash = self._hash_password(new_password, new_salt)
             
             # Update password
@@ -346,9 +449,9 @@ class UserRepository:
                     'locked_until': 0,
                     'updated_at': int(time.time())
                 },
-                "id = ?",
-                (user_id,)
+                [Predicate('id', 'eq', user_id)]
             )
+            self._invalidate_user(user_id)
             
             return rows_affected > 0
             
@@ -368,6 +471,8 @@ class UserRepository:
             Biometric data ID
         """
         try:
+            biometric_data = self._compress_biometric_data(biometric_data)
+            
             # Check if biometric data already exists
             existing = self.db.fetch_one(
                 "SELECT id FROM user_biometrics WHERE user_id = ? AND biometric_type = ?",
@@ -384,13 +489,12 @@ class UserRepository:
                         'biometric_data': biometric_data,
                         'updated_at': now
                     },
-                    "id = ?",
-                    (existing['id'],)
+                    [Predicate('id', 'eq', existing['id'])]
                 )
                 return existing['id']
             else:
                 # Insert new biometric data
-                biometric_id = str(uuid.uuid4())
+                biometric_id = generate_ulid()
                 self.db.insert(
                     'user_biometrics',
                     {
@@ -424,12 +528,53 @@ class UserRepository:
                 (user_id, biometric_type)
             )
             
-            return result['biometric_data'] if result else None
+            return self._decompress_biometric_data(bytes(result['biometric_data'])) if result else None
             
         except Exception as e:
             logger.error(f"Error getting biometric data for user {user_id}: {e}")
             raise
     
+    def open_biometric_blob(self, user_id: str, biometric_type: str) -> Optional[Any]:
+        """Open user biometric data for incremental reading.
+        
+        Lets callers read only the slice of a large template they need instead
+        of loading the whole BLOB like get_biometric_data does. Compressed data
+        is decompressed as it is read from the BLOB, so the returned stream is
+        forward-only in that case.
+        
+        Args:
+            user_id: User ID
+            biometric_type: Type of biometric data (face, fingerprint, voice)
+            
+        Returns:
+            Read-only file-like object (close it after use) or None if not found
+            
+        Raises:
+            RuntimeError: If the data is compressed and zstandard is not available
+        """
+        try:
+            blob = self.db.open_blob(
+                'user_biometrics',
+                'biometric_data',
+                [Predicate('user_id', 'eq', user_id), Predicate('biometric_type', 'eq', biometric_type)]
+            )
+            if blob is None:
+                return None
+            
+            if blob.read(len(_BIOMETRIC_ZSTD_MAGIC)) != _BIOMETRIC_ZSTD_MAGIC:
+                blob.seek(0)
+                return blob
+            
+            if not ZSTD_AVAILABLE:
+                blob.close()
+                raise RuntimeError("Biometric data is zstd-compressed but the zstandard package is not installed")
+            
+            return zstandard.ZstdDecompressor().stream_reader(blob)
+            
+        except Exception as e:
+            logger.error(f"Error opening biometric data for user {user_id}: {e}")
+            raise
+    
     def delete_biometric_data(self, user_id: str, biometric_type: str) -> bool:
         """Delete user biometric data.
         
@@ -443,8 +588,7 @@ class UserRepository:
         try:
             rows_affected = self.db.delete(
                 'user_biometrics',
-                "user_id = ? AND biometric_type = ?",
-                (user_id, biometric_type)
+                [Predicate('user_id', 'eq', user_id), Predicate('biometric_type', 'eq', biometric_type)]
             )
             
             return rows_affected > 0
@@ -467,7 +611,7 @@ class UserRepository:
             Session ID
         """
         try:
-            session_id = str(uuid.uuid4())
+            session_id = generate_ulid()
             now = int(time.time())
             
             self.db.insert(
@@ -499,12 +643,8 @@ class UserRepository:
             Session data or None if not found or expired
         """
         try:
-            now = int(time.time())
-            
-            session = self.db.fetch_one(
-                "SELECT * FROM user_sessions WHERE token = ? AND expires_at > ? AND revoked = 0",
-                (token, now)
-            )
+            # Not cached, so a revocation by any process is seen on the next lookup
+            session = self.db.fetch_one(_SQL_GET_SESSION, (token, int(time.time())))
             
             if session and session.get('device_info'):
                 session['device_info'] = json.loads(session['device_info'])
@@ -528,8 +668,7 @@ class UserRepository:
             rows_affected = self.db.update(
                 'user_sessions',
                 {'revoked': 1},
-                "token = ?",
-                (token,)
+                [Predicate('token', 'eq', token)]
             )
             
             return rows_affected > 0
@@ -549,22 +688,12 @@ class UserRepository:
             Number of sessions revoked
         """
         try:
+            # One UPDATE, built by the database manager for the configured backend
+            condition = [Predicate('user_id', 'eq', user_id), Predicate('revoked', 'eq', 0)]
             if except_token:
-                rows_affected = self.db.update(
-                    'user_sessions',
-                    {'revoked': 1},
-                    "user_id = ? AND token != ? AND revoked = 0",
-                    (user_id, except_token)
-                )
-            else:
-                rows_affected = self.db.update(
-                    'user_sessions',
-                    {'revoked': 1},
-                    "user_id = ? AND revoked = 0",
-                    (user_id,)
-                )
+                condition.append(Predicate('token', 'ne', except_token))
             
-            return rows_affected
+            return self.db.update('user_sessions', {'revoked': 1}, condition)
             
         except Exception as e:
             logger.error(f"Error revoking all sessions for user {user_id}: {e}")
@@ -581,8 +710,7 @@ class UserRepository:
             
             rows_affected = self.db.delete(
                 'user_sessions',
-                "expires_at < ?",
-                (now,)
+                [Predicate('expires_at', 'lt', now)]
             )
             
             return rows_affected
@@ -599,7 +727,8 @@ class UserRepository:
             per_page: Number of users per page
             
         Returns:
-            Dictionary with users and total count
+            Dictionary with users (including biometric_types and
+            active_sessions) and total count
         """
         try:
             # Calculate offset
@@ -611,6 +740,31 @@ class UserRepository:
                 (per_page, offset)
             )
             
+            # Attach biometric types and active session counts for the whole page
+            # in one query each instead of a follow-up query per user
+            if users:
+                user_ids = [user['id'] for user in users]
+                placeholders = ', '.join('?' * len(user_ids))
+                
+                biometric_types = {}
+                for row in self.db.fetch_all(
+                    f"SELECT user_id, biometric_type FROM user_biometrics WHERE user_id IN ({placeholders})",
+                    tuple(user_ids)
+                ):
+                    biometric_types.setdefault(row['user_id'], []).append(row['biometric_type'])
+                
+                session_counts = {
+                    row['user_id']: row['count']
+                    for row in self.db.fetch_all(
+                        f"SELECT user_id, COUNT(*) as count FROM user_sessions WHERE user_id IN ({placeholders}) AND expires_at > ? AND revoked = 0 GROUP BY user_id",
+                        (*user_ids, int(time.time()))
+                    )
+                }
+                
+                for user in users:
+                    user['biometric_types'] = biometric_types.get(user['id'], [])
+                    user['active_sessions'] = session_counts.get(user['id'], 0)
+            
             # Get total count
             total = self.db.fetch_one("SELECT COUNT(*) as count FROM users")
             
@@ -659,9 +813,101 @@ class UserRepository:
             logger.error(f"Error getting active user count: {e}")
             raise
     
+    def _compress_biometric_data(self, data: bytes) -> bytes:
+        """Compress biometric data with Zstandard.
+        
+        Args:
+            data: Binary biometric data
+            
+        Returns:
+            Magic and compressed frame, or the data unchanged if zstandard is not
+            available, the data is already compressed, or compression does not
+            reduce its size
+        """
+        if not ZSTD_AVAILABLE or data.startswith(_BIOMETRIC_ZSTD_MAGIC):
+            return data
+        
+        compressed = _BIOMETRIC_ZSTD_MAGIC + \
+            zstandard.ZstdCompressor(level=BIOMETRIC_ZSTD_LEVEL).compress(data)
+        
+        return compressed if len(compressed) < len(data) else data
+    
+    def _decompress_biometric_data(self, data: bytes) -> bytes:
+        """Decompress biometric data written by _compress_biometric_data.
+        
+        Args:
+            data: Stored biometric data
+            
+        Returns:
+            Binary biometric data (uncompressed data is returned unchanged)
+            
+        Raises:
+            RuntimeError: If the data is compressed and zstandard is not available
+        """
+        if not data.startswith(_BIOMETRIC_ZSTD_MAGIC):
+            return data
+        
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Biometric data is zstd-compressed but the zstandard package is not installed")
+        
+        return zstandard.ZstdDecompressor().decompress(data[len(_BIOMETRIC_ZSTD_MAGIC):])
+    
+    def _lookup_user(self, column: str, value: str) -> Optional[Dict[str, Any]]:
+        """Get a public user row by a unique column, going through the user cache.
+        
+        Only USER_PUBLIC_COLS are selected, so the password hash and salt are
+        never read here or held in the cache.
+        
+        Args:
+            column: Lookup column (id, username or email)
+            value: Column value
+            
+        Returns:
+            Copy of the public user row or None if not found
+        """
+        user = self._user_cache.get((column, value))
+        if user is None:
+            user = self.db.fetch_one(_SQL_PUBLIC_USER_BY[column], (value,))
+            if not user:
+                return None
+            
+            for key in ('id', 'username', 'email'):
+                self._user_cache.set((key, user[key]), user)
+        
+        return dict(user)
+    
+    def _invalidate_user(self, user_id: str) -> None:
+        """Drop every cached entry for a user after it changes.
+        
+        Args:
+            user_id: User ID
+        """
+        self._user_cache.pop_matching(lambda user: user['id'] == user_id)
+    
     def _hash_password(self, password: str, salt: str) -> str:
         """Hash a password with the given salt.
         
+        Args:
+            password: Password to hash
+            salt: Salt for hashing
+            
+        Returns:
+            Encoded Argon2id hash (parameters, salt and digest)
+        """
+        return _KDF_POOL.submit(
+            hash_secret,
+            password.encode('utf-8'),
+            bytes.fromhex(salt),
+            time_cost=ARGON2_TIME_COST,
+            memory_cost=ARGON2_MEMORY_COST,
+            parallelism=ARGON2_PARALLELISM,
+            hash_len=ARGON2_HASH_LEN,
+            type=Type.ID
+        ).result().decode('ascii')
+    
+    def _hash_password_legacy(self, password: str, salt: str) -> str:
+        """Hash a password with PBKDF2, as stored before Argon2id was adopted.
+        
         Args:
             password: Password to hash
             salt: Salt for hashing
@@ -670,34 +916,109 @@ class UserRepository:
             Hashed password
         """
         # Use PBKDF2 with SHA-256
-        key = hashlib.pbkdf2_hmac(
+        key = _KDF_POOL.submit(
+            hashlib.pbkdf2_hmac,
             'sha256',
             password.encode('utf-8'),
             bytes.fromhex(salt),
             100000  # 100,000 iterations
-        )
+        ).result()
         
         return key.hex()
     
-    def _increment_login_attempts(self, user_id: str, current_attempts: int) -> None:
+    def _check_password(self, password: str, user: Dict[str, Any]) -> bool:
+        """Check a password against a user's stored hash.
+        
+        Args:
+            password: Password to check
+            user: User row including password_hash and salt
+            
+        Returns:
+            True if the password matches, False otherwise
+        """
+        stored_hash = user['password_hash']
+        
+        if stored_hash.startswith('$argon2'):
+            try:
+                return _KDF_POOL.submit(_PASSWORD_HASHER.verify, stored_hash, password).result()
+            except argon2.exceptions.VerificationError:
+                return False
+            except argon2.exceptions.InvalidHashError:
+                logger.warning(f"Invalid password hash stored for user {user['id']}")
+                return False
+        
+        # Constant-time comparison so mismatch position does not leak through timing
+        return hmac.compare_digest(self._hash_password_legacy(password, user['salt']), stored_hash)
+    
+    def _needs_rehash(self, stored_hash: str) -> bool:
+        """Check whether a stored hash is legacy PBKDF2 or uses outdated Argon2 parameters.
+        
+        Args:
+            stored_hash: Stored password hash
+            
+        Returns:
+            True if the hash should be replaced on next successful login
+        """
+        if not stored_hash.startswith('$argon2'):
+            return True
+        return _PASSWORD_HASHER.check_needs_rehash(stored_hash)
+    
+    def _take_login_token(self, key: Tuple[str, Optional[str]]) -> bool:
+        """Consume one login attempt from a token bucket.
+        
+        Buckets hold up to LOGIN_RATE_BURST attempts and refill at
+        LOGIN_RATE_PER_MINUTE (both read when the repository is created), so
+        short bursts pass but sustained guessing is throttled even for accounts
+        that are not locked. Guesses spread over many clients each get a fresh
+        bucket and are bounded only by the MAX_LOGIN_ATTEMPTS account lockout.
+        
+        Args:
+            key: (user ID, client identifier) the attempt is counted against
+            
+        Returns:
+            True if the attempt is allowed, False if the bucket is empty
+        """
+        burst = self._login_rate_burst
+        now = time.monotonic()
+        
+        with self._login_bucket_lock:
+            tokens, last_refill = self._login_buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last_refill) * self._login_refill_per_second)
+            
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            
+            self._login_buckets.set(key, (tokens, now))
+        
+        return allowed
+    
+    def _increment_login_attempts(self, user_id: str) -> None:
         """Increment login attempts and lock account if necessary.
         
+        The increment and lock happen in a single UPDATE, so concurrent failed
+        logins cannot overwrite each other's count.
+        
         Args:
             user_id: User ID
-            current_attempts: Current number of login attempts
         """
         # Get max login attempts from environment or use default
         max_attempts = int(os.environ.get('MAX_LOGIN_ATTEMPTS', '5'))
         lockout_minutes = int(os.environ.get('LOCKOUT_MINUTES', '30'))
         
-        new_attempts = current_attempts + 1
-        update_data = {'login_attempts': new_attempts}
-        
         # Lock account if max attempts reached
-        if new_attempts >= max_attempts:
-            now = int(time.time())
-            locked_until = now + (lockout_minutes * 60)
-            update_data['locked_until'] = locked_until
-            logger.warning(f"User {user_id} locked until {datetime.fromtimestamp(locked_until)}")
+        locked_until = int(time.time()) + (lockout_minutes * 60)
+        result = self.db.fetch_one(
+            """
+            UPDATE users
+            SET login_attempts = login_attempts + 1,
+                locked_until = CASE WHEN login_attempts + 1 >= ? THEN ? ELSE locked_until END
+            WHERE id = ?
+            RETURNING login_attempts
+            """,
+            (max_attempts, locked_until, user_id)
+        )
+        self._invalidate_user(user_id)
         
-        self.db.update('users', update_data, "id = ?", (user_id,))
\ No newline at end of file
+        if result and result['login_attempts'] >= max_attempts:
+            logger.warning(f"User {user_id} locked until {datetime.fromtimestamp(locked_until)}")
\ No newline at end of file
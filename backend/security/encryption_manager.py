@@ -1,15 +1,27 @@
 import os
 import base64
+import hashlib
 import logging
+import secrets
 from typing import Dict, Any, Optional, Union, Tuple
 
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+
+from ..utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Derived keys keyed by (SHA-256 of the password, salt) so repeated
+# derivations skip the 100k-iteration KDF without keeping the password itself
+_DERIVED_KEY_CACHE = LRUCache(maxsize=32)
+
+# Marks dictionary values written by encrypt_dict
+ENCRYPTED_VALUE_PREFIX = 'ENC:'
+
+# Base64 of the Fernet version byte plus the zero high bytes of its timestamp,
+# which begins every unmarked value written before the prefix was introduced
+_LEGACY_ENCRYPTED_PREFIX = 'Z0FBQUFB'
+
 class EncryptionManager:
     """Manager for data encryption and decryption."""
     
@@ -39,7 +51,7 @@ class EncryptionManager:
             self.salt = base64.b64decode(salt_str)
         else:
             # Generate a random salt if not provided
-            self.salt = os.urandom(16)
+            self.salt = secrets.token_bytes(16)
             logger.warning("No encryption salt provided, generated a new one. This should be saved and reused.")
         
         # Create the Fernet cipher
@@ -59,16 +71,17 @@ class EncryptionManager:
         """
         if not salt:
             salt = self.salt
-            
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
+        
+        password_bytes = password.encode('utf-8')
+        cache_key = (hashlib.sha256(password_bytes).digest(), salt)
+        
+        key = _DERIVED_KEY_CACHE.get(cache_key)
+        if key is None:
+            # hashlib's PBKDF2 runs in C (OpenSSL where available) with no KDF object setup
+            raw = hashlib.pbkdf2_hmac('sha256', password_bytes, salt, 100000, dklen=32)
+            key = base64.urlsafe_b64encode(raw)
+            _DERIVED_KEY_CACHE.set(cache_key, key)
+        
         return key
     
     def encrypt(self, data: Union[str, bytes]) -> bytes:
@@ -134,17 +147,22 @@ class EncryptionManager:
             data: Dictionary with values to encrypt
             
         Returns:
-            Dictionary with encrypted values
+            Dictionary with encrypted values, each prefixed with ENCRYPTED_VALUE_PREFIX
         """
         encrypted = {}
-        for key, value in data.items():
-            if isinstance(value, (str, bytes)):
-                encrypted[key] = self.encrypt_to_string(value)
-            elif isinstance(value, dict):
-                encrypted[key] = self.encrypt_dict(value)
-            else:
-                encrypted[key] = value
-                
+        stack = [(data, encrypted)]
+        
+        while stack:
+            source, target = stack.pop()
+            for key, value in source.items():
+                if isinstance(value, (str, bytes)):
+                    target[key] = ENCRYPTED_VALUE_PREFIX + self.encrypt_to_string(value)
+                elif isinstance(value, dict):
+                    target[key] = {}
+                    stack.append((value, target[key]))
+                else:
+                    target[key] = value
+        
         return encrypted
     
     def decrypt_dict(self, encrypted_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -160,18 +178,25 @@ class EncryptionManager:
             InvalidToken: If any value cannot be decrypted
         """
         decrypted = {}
-        for key, value in encrypted_data.items():
-            if isinstance(value, str):
-                try:
-                    decrypted[key] = self.decrypt_from_string(value)
-                except Exception:
-                    # If decryption fails, assume it wasn't encrypted
-                    decrypted[key] = value
-            elif isinstance(value, dict):
-                decrypted[key] = self.decrypt_dict(value)
-            else:
-                decrypted[key] = value
-                
+        stack = [(encrypted_data, decrypted)]
+        
+        while stack:
+            source, target = stack.pop()
+            for key, value in source.items():
+                if isinstance(value, str) and value.startswith(ENCRYPTED_VALUE_PREFIX):
+                    target[key] = self.decrypt_from_string(value[len(ENCRYPTED_VALUE_PREFIX):])
+                elif isinstance(value, str) and value.startswith(_LEGACY_ENCRYPTED_PREFIX):
+                    try:
+                        target[key] = self.decrypt_from_string(value)
+                    except Exception:
+                        # Unmarked legacy value that only looks encrypted
+                        target[key] = value
+                elif isinstance(value, dict):
+                    target[key] = {}
+                    stack.append((value, target[key]))
+                else:
+                    target[key] = value
+        
         return decrypted
     
     def get_key_as_string(self) -> str:
@@ -198,5 +223,5 @@ class EncryptionManager:
             Tuple of (key, salt) as strings
         """
         key = Fernet.generate_key().decode('utf-8')
-        salt = base64.b64encode(os.urandom(16)).decode('utf-8')
+        salt = base64.b64encode(secrets.token_bytes(16)).decode('utf-8')
         return key, salt
\ No newline at end of file
@@ -1,13 +1,51 @@
 import os
+import time
+import hashlib
 import logging
 import datetime
+from types import ModuleType
 from typing import Dict, Any, Optional, List, Union
 
-from jose import jwt, JWTError
-from jose.exceptions import ExpiredSignatureError, JWTClaimsError
+from ..utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# PyJWT (and the cryptography stack behind it) is imported on first use,
+# so importing this package does not pay for it unless tokens are handled
+_jwt: Optional[ModuleType] = None
+
+def _load_jwt() -> ModuleType:
+    """Import PyJWT on first use.
+    
+    Returns:
+        The jwt package with its algorithms module loaded
+    """
+    global _jwt
+    if _jwt is None:
+        import jwt
+        import jwt.algorithms
+        _jwt = jwt
+    return _jwt
+
+# Decoded payloads are cached until the token expires, capped at TOKEN_CACHE_MAX_TTL;
+# rejected tokens are remembered briefly so replaying them skips signature checks
+TOKEN_CACHE_SIZE = 4096
+TOKEN_CACHE_MAX_TTL = 3600  # seconds
+TOKEN_CACHE_NEGATIVE_TTL = 5  # seconds
+
+def _stringify_sub(claims: Dict[str, Any]) -> None:
+    """Convert a non-string sub claim to a string in place.
+    
+    PyJWT rejects tokens whose subject is not a string when decoding them,
+    so integer user IDs are encoded as their string form.
+    
+    Args:
+        claims: Claims about to be encoded
+    """
+    sub = claims.get("sub")
+    if sub is not None and not isinstance(sub, str):
+        claims["sub"] = str(sub)
+
 class JWTManager:
     """Manager for JWT token generation and validation."""
     
@@ -20,6 +58,10 @@ class JWTManager:
             algorithm: JWT algorithm to use
             access_token_expire_minutes: Access token expiration time in minutes
             refresh_token_expire_days: Refresh token expiration time in days
+            
+        Raises:
+            ValueError: If no secret key is set, the algorithm is not supported
+                or the key cannot be used with it
         """
         self.secret_key = secret_key or os.environ.get('JWT_SECRET_KEY')
         if not self.secret_key:
@@ -28,6 +70,23 @@ class JWTManager:
         self.algorithm = algorithm
         self.access_token_expire_minutes = access_token_expire_minutes
         self.refresh_token_expire_days = refresh_token_expire_days
+        self._access_expire_seconds = access_token_expire_minutes * 60
+        self._refresh_expire_seconds = refresh_token_expire_days * 86400
+        
+        # Unsigned tokens are never accepted
+        jwt = _load_jwt()
+        algorithms = jwt.algorithms.get_default_algorithms()
+        if algorithm == 'none' or algorithm not in algorithms:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        
+        # Prepare the algorithm's key once instead of on every encode/decode
+        try:
+            self._key = algorithms[algorithm].prepare_key(self.secret_key)
+        except jwt.InvalidKeyError as e:
+            raise ValueError(f"Secret key cannot be used with {algorithm}: {e}") from e
+        
+        # Token digest -> decoded payload or the error it was rejected with
+        self._token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
         
         logger.info("JWT manager initialized")
     
@@ -35,7 +94,7 @@ class JWTManager:
         """Create a new access token.
         
         Args:
-            data: Data to encode in the token
+            data: Data to encode in the token (a non-string sub is encoded as a string)
             expires_delta: Custom expiration time (optional)
             
         Returns:
@@ -43,21 +102,23 @@ class JWTManager:
         """
         to_encode = data.copy()
         
+        # exp is serialized as integer seconds, so build it directly
         if expires_delta:
-            expire = datetime.datetime.utcnow() + expires_delta
+            expire = int(time.time()) + int(expires_delta.total_seconds())
         else:
-            expire = datetime.datetime.utcnow() + datetime.timedelta(minutes=self.access_token_expire_minutes)
+            expire = int(time.time()) + self._access_expire_seconds
         
         to_encode.update({"exp": expire, "token_type": "access"})
+        _stringify_sub(to_encode)
         
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        encoded_jwt = _load_jwt().encode(to_encode, self._key, algorithm=self.algorithm)
         return encoded_jwt
     
     def create_refresh_token(self, data: Dict[str, Any], expires_delta: Optional[datetime.timedelta] = None) -> str:
         """Create a new refresh token.
         
         Args:
-            data: Data to encode in the token
+            data: Data to encode in the token (a non-string sub is encoded as a string)
             expires_delta: Custom expiration time (optional)
             
         Returns:
@@ -65,14 +126,16 @@ class JWTManager:
         """
         to_encode = data.copy()
         
+        # exp is serialized as integer seconds, so build it directly
         if expires_delta:
-            expire = datetime.datetime.utcnow() + expires_delta
+            expire = int(time.time()) + int(expires_delta.total_seconds())
         else:
-            expire = datetime.datetime.utcnow() + datetime.timedelta(days=self.refresh_token_expire_days)
+            expire = int(time.time()) + self._refresh_expire_seconds
         
         to_encode.update({"exp": expire, "token_type": "refresh"})
+        _stringify_sub(to_encode)
         
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        encoded_jwt = _load_jwt().encode(to_encode, self._key, algorithm=self.algorithm)
         return encoded_jwt
     
     def decode_token(self, token: str) -> Dict[str, Any]:
@@ -82,25 +145,48 @@ class JWTManager:
             token: JWT token to decode
             
         Returns:
-            Decoded token payload
+            Decoded token payload (a fresh copy the caller may modify)
             
         Raises:
-            JWTError: If token is invalid
+            InvalidTokenError: If token is invalid
             ExpiredSignatureError: If token has expired
-            JWTClaimsError: If token claims are invalid
         """
+        # Key on a fixed-size BLAKE2b digest rather than the token itself, so
+        # the cache neither holds bearer tokens nor compares them byte by byte
+        cache_key = hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+        
+        jwt = _load_jwt()
+        
+        cached = self._token_cache.get(cache_key)
+        if isinstance(cached, jwt.InvalidTokenError):
+            raise type(cached)(*cached.args)
+        if cached is not None:
+            return dict(cached)
+        
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
-        except ExpiredSignatureError:
+            payload = jwt.decode(token, self._key, algorithms=[self.algorithm])
+        except jwt.ExpiredSignatureError as e:
             logger.warning("Token has expired")
+            self._token_cache.set(cache_key, e, ttl=TOKEN_CACHE_NEGATIVE_TTL)
             raise
-        except JWTClaimsError as e:
+        except (jwt.ImmatureSignatureError, jwt.InvalidAudienceError, jwt.InvalidIssuerError,
+                jwt.InvalidIssuedAtError, jwt.MissingRequiredClaimError) as e:
             logger.warning(f"Invalid token claims: {e}")
+            self._token_cache.set(cache_key, e, ttl=TOKEN_CACHE_NEGATIVE_TTL)
             raise
-        except JWTError as e:
+        except jwt.InvalidTokenError as e:
             logger.warning(f"Invalid token: {e}")
+            self._token_cache.set(cache_key, e, ttl=TOKEN_CACHE_NEGATIVE_TTL)
             raise
+        
+        # Never serve a cached payload past the token's own expiry
+        ttl = TOKEN_CACHE_MAX_TTL
+        if isinstance(payload.get("exp"), (int, float)):
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            self._token_cache.set(cache_key, payload, ttl=ttl)
+        
+        return dict(payload)
     
     def verify_access_token(self, token: str) -> Dict[str, Any]:
         """Verify an access token.
@@ -113,7 +199,7 @@ class JWTManager:
             
         Raises:
             ValueError: If token is not an access token
-            JWTError: If token is invalid
+            InvalidTokenError: If token is invalid
         """
         payload = self.decode_token(token)
         
@@ -134,7 +220,7 @@ class JWTManager:
             
         Raises:
             ValueError: If token is not a refresh token
-            JWTError: If token is invalid
+            InvalidTokenError: If token is invalid
         """
         payload = self.decode_token(token)
         
@@ -155,31 +241,58 @@ class JWTManager:
             
         Raises:
             ValueError: If token is not a refresh token
-            JWTError: If token is invalid
+            InvalidTokenError: If token is invalid
         """
         payload = self.verify_refresh_token(refresh_token)
         
-        # Remove token-specific fields
-        if "exp" in payload:
-            del payload["exp"]
-        if "token_type" in payload:
-            del payload["token_type"]
+        # decode_token returns a private copy, so overwrite the token-specific
+        # fields in place rather than deleting them and copying again
+        payload["exp"] = int(time.time()) + self._access_expire_seconds
+        payload["token_type"] = "access"
         
-        return self.create_access_token(payload)
+        return _load_jwt().encode(payload, self._key, algorithm=self.algorithm)
     
-    def get_token_expiration(self, token: str) -> datetime.datetime:
-        """Get the expiration time of a token.
+    def _peek_exp(self, token: str) -> int:
+        """Read a token's exp claim without verifying its signature.
+        
+        Only suitable for early-exit checks; anything that grants access must
+        still go through decode_token or the verify_* methods.
         
         Args:
             token: JWT token
             
+        Returns:
+            Expiration as a Unix timestamp
+            
+        Raises:
+            InvalidTokenError: If the token cannot be parsed
+            KeyError: If token does not have an expiration
+        """
+        exp = _load_jwt().decode(token, options={"verify_signature": False}).get("exp")
+        
+        if exp is None:
+            raise KeyError("Token does not have an expiration")
+        
+        return exp
+    
+    def get_token_expiration(self, token: str, verify: bool = True) -> datetime.datetime:
+        """Get the expiration time of a token.
+        
+        Args:
+            token: JWT token
+            verify: Verify the token's signature and claims first; with False
+                the exp claim is read from the unverified payload
+                
         Returns:
             Expiration datetime
             
         Raises:
-            JWTError: If token is invalid
+            InvalidTokenError: If token is invalid
             KeyError: If token does not have an expiration
         """
+        if not verify:
+            return datetime.datetime.fromtimestamp(self._peek_exp(token))
+        
         payload = self.decode_token(token)
         
         if "exp" not in payload:
@@ -187,6 +300,26 @@ class JWTManager:
         
         return datetime.datetime.fromtimestamp(payload["exp"])
     
+    def get_token_remaining_seconds(self, token: str) -> float:
+        """Get the number of seconds until a token expires.
+        
+        Args:
+            token: JWT token
+            
+        Returns:
+            Remaining seconds (0.0 if already expired)
+            
+        Raises:
+            InvalidTokenError: If token is invalid
+            KeyError: If token does not have an expiration
+        """
+        payload = self.decode_token(token)
+        
+        if "exp" not in payload:
+            raise KeyError("Token does not have an expiration")
+        
+        return max(0.0, payload["exp"] - time.time())
+    
     def get_token_remaining_time(self, token: str) -> datetime.timedelta:
         """Get the remaining time until a token expires.
         
@@ -197,16 +330,18 @@ class JWTManager:
             Remaining time as timedelta
             
         Raises:
-            JWTError: If token is invalid
+            InvalidTokenError: If token is invalid
             KeyError: If token does not have an expiration
         """
-        expiration = self.get_token_expiration(token)
-        remaining = expiration - datetime.datetime.utcnow()
-        return remaining if remaining.total_seconds() > 0 else datetime.timedelta(0)
+        return datetime.timedelta(seconds=self.get_token_remaining_seconds(token))
     
     def is_token_expired(self, token: str) -> bool:
         """Check if a token has expired.
         
+        The exp claim is read without verifying the signature, so a False
+        result does not mean the token is valid; use verify_access_token or
+        verify_refresh_token for authentication.
+        
         Args:
             token: JWT token
             
@@ -214,11 +349,7 @@ class JWTManager:
             True if token has expired, False otherwise
             
         Raises:
-            JWTError: If token is invalid
+            InvalidTokenError: If the token cannot be parsed
             KeyError: If token does not have an expiration
         """
-        try:
-            remaining = self.get_token_remaining_time(token)
-            return remaining.total_seconds() <= 0
-        except ExpiredSignatureError:
-            return True
\ No newline at end of file
+        return self._peek_exp(token) <= time.time()
\ No newline at end of file
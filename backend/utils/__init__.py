@@ -1,5 +1,6 @@
 from .logger import setup_logger
-from .validators import validate_email, validate_password
-from .helpers import generate_id, current_timestamp
+from .validators import validate_email, validate_password, validate_emails_batch, validate_passwords_batch
+from .helpers import generate_id, generate_ulid, current_timestamp
+from .cache import LRUCache
 
-__all__ = ['setup_logger', 'validate_email', 'validate_password', 'generate_id', 'current_timestamp']
\ No newline at end of file
+__all__ = ['setup_logger', 'validate_email', 'validate_password', 'validate_emails_batch', 'validate_passwords_batch', 'generate_id', 'generate_ulid', 'current_timestamp', 'LRUCache']
\ No newline at end of file
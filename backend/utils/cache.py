@@ -0,0 +1,105 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with optional entry expiry.
+    
+    Once the cache holds ``maxsize`` entries the least recently used one is
+    evicted. Entries given a TTL are dropped when they are read after it
+    has passed.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries
+            ttl: Default entry lifetime in seconds (None for no expiry)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, Tuple[Any, Optional[float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value and mark it as recently used.
+        
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+            
+        Returns:
+            Cached value, or default if missing or expired
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry if full.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Entry lifetime in seconds (defaults to the cache TTL)
+        """
+        if ttl is None:
+            ttl = self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry.
+        
+        Args:
+            key: Cache key
+            default: Value returned if the key is not cached
+            
+        Returns:
+            Removed value or default
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+    
+    def pop_matching(self, predicate: Callable[[Any], bool]) -> int:
+        """Remove every entry whose value matches a predicate.
+        
+        Args:
+            predicate: Function called with each cached value
+            
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        """Count the entries that have not expired."""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for _, expires_at in self._data.values() if expires_at is None or expires_at > now)
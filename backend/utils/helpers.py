@@ -1,8 +1,20 @@
-import uuid
+import os
 import time
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+# Crockford base32 alphabet used by ULIDs
+_ULID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+# Last ULID timestamp and random part, so IDs stay monotonic within a millisecond
+_ulid_lock = threading.Lock()
+_ulid_last_ms = 0
+_ulid_last_random = 0
+
+# Sentinel telling a missing key apart from a stored None
+_MISSING = object()
+
 def generate_id(prefix: str = '') -> str:
     """Generate a unique ID.
     
@@ -10,13 +22,42 @@ def generate_id(prefix: str = '') -> str:
         prefix: Optional prefix for the ID
         
     Returns:
-        Unique ID string
+        Unique ID string (128 random bits as 32 hex characters)
     """
-    unique_id = str(uuid.uuid4())
+    unique_id = os.urandom(16).hex()
     if prefix:
         return f"{prefix}_{unique_id}"
     return unique_id
 
+def generate_ulid() -> str:
+    """Generate a ULID (48-bit millisecond timestamp + 80 random bits).
+    
+    ULIDs sort lexicographically by creation time, so using them as primary
+    keys makes inserts append to the end of the index instead of scattering
+    across it. IDs generated within the same millisecond increment the random
+    part, keeping them strictly increasing per process.
+    
+    Returns:
+        26-character Crockford base32 ULID string
+    """
+    global _ulid_last_ms, _ulid_last_random
+    
+    with _ulid_lock:
+        timestamp_ms = time.time_ns() // 1_000_000
+        if timestamp_ms <= _ulid_last_ms:
+            timestamp_ms = _ulid_last_ms
+            random_part = _ulid_last_random + 1
+            if random_part >> 80:
+                timestamp_ms += 1
+                random_part = int.from_bytes(os.urandom(10), 'big')
+        else:
+            random_part = int.from_bytes(os.urandom(10), 'big')
+        
+        _ulid_last_ms, _ulid_last_random = timestamp_ms, random_part
+    
+    value = (timestamp_ms << 80) | random_part
+    return ''.join(_ULID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
 def current_timestamp() -> int:
     """Get current Unix timestamp.
     
@@ -65,14 +106,23 @@ def flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '_') -> Dic
     Returns:
         Flattened dictionary
     """
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
+    result = {}
+    
+    # Depth-first walk with an explicit stack of item iterators, so keys come
+    # out in the same order a recursive walk would produce
+    stack = [(parent_key, iter(d.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for k, v in items:
+            new_key = f"{prefix}{sep}{k}" if prefix else k
+            if isinstance(v, dict):
+                stack.append((new_key, iter(v.items())))
+                break
+            result[new_key] = v
         else:
-            items.append((new_key, v))
-    return dict(items)
+            stack.pop()
+    
+    return result
 
 def safe_get(d: Dict[str, Any], key_path: str, default: Any = None, sep: str = '.') -> Any:
     """Safely get a value from a nested dictionary.
@@ -86,13 +136,17 @@ def safe_get(d: Dict[str, Any], key_path: str, default: Any = None, sep: str = '
     Returns:
         Value at key path or default
     """
-    keys = key_path.split(sep)
+    # Flat keys need neither the split nor the loop
+    if sep not in key_path:
+        return d.get(key_path, default) if isinstance(d, dict) else default
+    
     result = d
     
-    for key in keys:
-        if isinstance(result, dict) and key in result:
-            result = result[key]
-        else:
+    for key in key_path.split(sep):
+        if not isinstance(result, dict):
+            return default
+        result = result.get(key, _MISSING)
+        if result is _MISSING:
             return default
             
     return result
\ No newline at end of file
@@ -1,14 +1,146 @@
 import os
 import logging
 import sys
+import time
+import threading
 from logging.handlers import RotatingFileHandler
-from typing import Optional
+from typing import Dict, Optional, Tuple
+
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter that formats each second's timestamp only once.
+    
+    Records logged within the same second reuse the cached strftime output,
+    with milliseconds appended as the default formatter does.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (second, formatted string), replaced as a whole so threads never see a torn pair
+        self._cached_time: Tuple[int, str] = (-1, '')
+    
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        """Format the record's creation time.
+        
+        Args:
+            record: Log record
+            datefmt: strftime format (defaults to the standard asctime format)
+            
+        Returns:
+            Formatted timestamp
+        """
+        second = int(record.created)
+        cached_second, formatted = self._cached_time
+        if second != cached_second:
+            formatted = time.strftime(datefmt or self.default_time_format, self.converter(second))
+            self._cached_time = (second, formatted)
+        
+        if datefmt:
+            return formatted
+        return self.default_msec_format % (formatted, record.msecs)
+
+class FastRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that tracks the file size in-process.
+    
+    The stock handler stats the log path and seeks to the end of the file for
+    every record to decide whether to roll over. This one reads the size once
+    when opened and then counts the bytes it writes. It assumes it is the only
+    writer of the file, which rotation already requires.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Never roll over anything other than a regular file (bpo-45401)
+        self._regular_file = not os.path.exists(self.baseFilename) or os.path.isfile(self.baseFilename)
+        self._size = os.path.getsize(self.baseFilename) if os.path.isfile(self.baseFilename) else 0
+        self._record_size = 0
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """Check whether writing a record would push the file past maxBytes.
+        
+        Args:
+            record: Log record about to be written
+            
+        Returns:
+            True if the file should be rolled over first
+        """
+        if self.maxBytes <= 0 or not self._regular_file:
+            self._record_size = 0
+            return False
+        
+        msg = self.format(record) + self.terminator
+        self._record_size = len(msg) if msg.isascii() else len(msg.encode(self.encoding or 'utf-8', 'replace'))
+        
+        # An empty file is written to even if the record alone exceeds the limit
+        return self._size > 0 and self._size + self._record_size >= self.maxBytes
+    
+    def doRollover(self) -> None:
+        """Roll over the file and reset the tracked size."""
+        super().doRollover()
+        self._size = 0
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        """Write a record, rolling over first if needed.
+        
+        Args:
+            record: Log record
+        """
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            logging.FileHandler.emit(self, record)
+            self._size += self._record_size
+        except Exception:
+            self.handleError(record)
+
+# Formatters and handlers are shared by every setup_logger call, so repeated
+# calls neither allocate new ones nor open another descriptor per log file
+_DETAILED_FORMATTER = CachedTimeFormatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+)
+_SIMPLE_FORMATTER = CachedTimeFormatter('%(asctime)s - %(levelname)s - %(message)s')
+
+_CONSOLE_HANDLER = logging.StreamHandler(sys.stdout)
+_CONSOLE_HANDLER.setFormatter(_SIMPLE_FORMATTER)
+
+_FILE_HANDLERS: Dict[str, FastRotatingFileHandler] = {}
+_FILE_HANDLERS_LOCK = threading.Lock()
+
+def _get_file_handler(log_file: str, max_size: int, backup_count: int) -> FastRotatingFileHandler:
+    """Get the shared rotating handler for a log file, creating it on first use.
+    
+    Args:
+        log_file: Path to log file
+        max_size: Maximum log file size in bytes before rotation
+        backup_count: Number of backup log files to keep
+        
+    Returns:
+        File handler (rotation settings are those of the first call for the file)
+    """
+    path = os.path.abspath(log_file)
+    
+    with _FILE_HANDLERS_LOCK:
+        handler = _FILE_HANDLERS.get(path)
+        if handler is None:
+            # Create directory if it doesn't exist
+            log_dir = os.path.dirname(path)
+            if log_dir and not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+            
+            handler = FastRotatingFileHandler(
+                path, maxBytes=max_size, backupCount=backup_count
+            )
+            handler.setFormatter(_DETAILED_FORMATTER)
+            _FILE_HANDLERS[path] = handler
+        
+        return handler
 
 def setup_logger(name: str = None, level: int = logging.INFO, 
                log_file: Optional[str] = None, max_size: int = 10485760, 
                backup_count: int = 5) -> logging.Logger:
     """Set up a logger with console and optional file handlers.
     
+    Calling it again for an already configured logger only updates the level.
+    
     Args:
         name: Logger name (defaults to root logger if None)
         level: Logging level
@@ -23,32 +155,19 @@ def setup_logger(name: str = None, level: int = logging.INFO,
     logger = logging.getLogger(name)
     logger.setLevel(level)
     
-    # Clear existing handlers
-    for handler in logger.handlers[:]:  
-        logger.removeHandler(handler)
+    handlers = [_CONSOLE_HANDLER]
+    if log_file:
+        handlers.append(_get_file_handler(log_file, max_size, backup_count))
     
-    # Create formatters
-    detailed_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
-    )
-    simple_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    # Already set up with the same handlers
+    if logger.handlers == handlers:
+        return logger
     
-    # Create console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(simple_formatter)
-    logger.addHandler(console_handler)
+    # Replace existing handlers
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
     
-    # Create file handler if log file is specified
-    if log_file:
-        # Create directory if it doesn't exist
-        log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-            
-        file_handler = RotatingFileHandler(
-            log_file, maxBytes=max_size, backupCount=backup_count
-        )
-        file_handler.setFormatter(detailed_formatter)
-        logger.addHandler(file_handler)
+    for handler in handlers:
+        logger.addHandler(handler)
     
     return logger
\ No newline at end of file
@@ -1,5 +1,23 @@
 import re
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
+
+# Patterns compiled once at import instead of looked up in re's cache per call
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+_PHONE_RE = re.compile(r'^\+?[0-9]{10,15}$')
+
+# Deletes the formatting characters validate_phone ignores: parentheses, hyphens
+# and every character \s matches (all Unicode whitespace lies below U+3001)
+_PHONE_STRIP = str.maketrans('', '', '()-' + ''.join(
+    chr(code) for code in range(0x3001) if chr(code).isspace()
+))
+
+# Character classes a password must contain, as bit flags set by a single scan
+_PW_UPPER = 1
+_PW_LOWER = 2
+_PW_DIGIT = 4
+_PW_SPECIAL = 8
+_PW_SPECIAL_CHARS = frozenset('!@#$%^&*(),.?":{}|<>')
 
 def validate_email(email: str) -> Tuple[bool, Optional[str]]:
     """Validate email format.
@@ -14,8 +32,7 @@ def validate_email(email: str) -> Tuple[bool, Optional[str]]:
         return False, "Email cannot be empty"
     
     # Simple regex for email validation
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(pattern, email):
+    if not _EMAIL_RE.match(email):
         return False, "Invalid email format"
     
     return True, None
@@ -36,20 +53,32 @@ def validate_password(password: str, min_length: int = 8) -> Tuple[bool, Optiona
     if len(password) < min_length:
         return False, f"Password must be at least {min_length} characters long"
     
+    # Record which character classes appear in one pass over the password
+    mask = 0
+    for ch in password:
+        if 'A' <= ch <= 'Z':
+            mask |= _PW_UPPER
+        elif 'a' <= ch <= 'z':
+            mask |= _PW_LOWER
+        elif ch.isdecimal():
+            mask |= _PW_DIGIT
+        elif ch in _PW_SPECIAL_CHARS:
+            mask |= _PW_SPECIAL
+    
     # Check for at least one uppercase letter
-    if not re.search(r'[A-Z]', password):
+    if not mask & _PW_UPPER:
         return False, "Password must contain at least one uppercase letter"
     
     # Check for at least one lowercase letter
-    if not re.search(r'[a-z]', password):
+    if not mask & _PW_LOWER:
         return False, "Password must contain at least one lowercase letter"
     
     # Check for at least one digit
-    if not re.search(r'\d', password):
+    if not mask & _PW_DIGIT:
         return False, "Password must contain at least one digit"
     
     # Check for at least one special character
-    if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+    if not mask & _PW_SPECIAL:
         return False, "Password must contain at least one special character"
     
     return True, None
@@ -75,7 +104,7 @@ def validate_username(username: str, min_length: int = 3, max_length: int = 30)
         return False, f"Username must be at most {max_length} characters long"
     
     # Check for valid characters (alphanumeric, underscore, hyphen)
-    if not re.match(r'^[a-zA-Z0-9_-]+$', username):
+    if not _USERNAME_RE.match(username):
         return False, "Username can only contain letters, numbers, underscores, and hyphens"
     
     return True, None
@@ -93,10 +122,63 @@ def validate_phone(phone: str) -> Tuple[bool, Optional[str]]:
         return False, "Phone number cannot be empty"
     
     # Remove common formatting characters
-    cleaned = re.sub(r'[\s()-]', '', phone)
+    cleaned = phone.translate(_PHONE_STRIP)
     
     # Check if it's a valid phone number (simple check for digits and length)
-    if not re.match(r'^\+?[0-9]{10,15}$', cleaned):
+    if not _PHONE_RE.match(cleaned):
         return False, "Invalid phone number format"
     
-    return True, None
\ No newline at end of file
+    return True, None
+
+def validate_emails_batch(emails: List[str]) -> List[Tuple[bool, Optional[str]]]:
+    """Validate a list of email addresses.
+    
+    Equivalent to calling validate_email on each address, without the
+    per-call overhead.
+    
+    Args:
+        emails: Email addresses to validate
+        
+    Returns:
+        List of (is_valid, error_message) tuples in input order
+    """
+    match = _EMAIL_RE.match
+    return [
+        (True, None) if email and match(email)
+        else (False, "Invalid email format" if email else "Email cannot be empty")
+        for email in emails
+    ]
+
+def validate_usernames_batch(usernames: List[str], min_length: int = 3,
+                             max_length: int = 30) -> List[Tuple[bool, Optional[str]]]:
+    """Validate a list of usernames.
+    
+    Equivalent to calling validate_username on each username, with the
+    common valid case decided inline.
+    
+    Args:
+        usernames: Usernames to validate
+        min_length: Minimum username length
+        max_length: Maximum username length
+        
+    Returns:
+        List of (is_valid, error_message) tuples in input order
+    """
+    match = _USERNAME_RE.match
+    return [
+        (True, None) if username and min_length <= len(username) <= max_length and match(username)
+        else validate_username(username, min_length, max_length)
+        for username in usernames
+    ]
+
+def validate_passwords_batch(passwords: List[str], min_length: int = 8) -> List[Tuple[bool, Optional[str]]]:
+    """Validate a list of passwords.
+    
+    Args:
+        passwords: Passwords to validate
+        min_length: Minimum password length
+        
+    Returns:
+        List of (is_valid, error_message) tuples in input order
+    """
+    return [validate_password(password, min_length) for password in passwords]
\ No newline at end of file
@@ -0,0 +1,19 @@
+import pytest
+
+from backend.database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Build SQLite database managers on a temporary file."""
+    managers = []
+    
+    def make(**config):
+        db = DatabaseManager({'db_type': 'sqlite', 'db_path': str(tmp_path / 'test.db'), **config})
+        managers.append(db)
+        return db
+    
+    yield make
+    
+    for db in managers:
+        db.close()
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from backend.database.behavior_repository import BehaviorRepository
+from backend.database.user_repository import UserRepository
+
+
+@pytest.mark.parametrize('config', [{}, {'sqlite_pragmas': ("journal_mode = WAL",)}])
+def test_delete_user_data_removes_session_rows(make_db, config):
+    db = make_db(**config)
+    user_id = UserRepository(db).create_user(
+        {'username': 'alice', 'email': 'alice@example.com', 'password': 'Passw0rd!'}
+    )
+    behavior = BehaviorRepository(db)
+    session_id = behavior.create_session(user_id, 'login')
+    behavior.store_keystroke_batch(session_id, user_id, [{'key_code': i} for i in range(3)])
+    behavior.store_mouse_batch(session_id, user_id, [{'event_type': 'move', 'x': i} for i in range(2)])
+    behavior.store_device_data(session_id, user_id, {'plugins': []})
+    behavior.store_geo_data(session_id, user_id, {'latitude': 1.0})
+    
+    counts = behavior.delete_user_data(user_id)
+    
+    assert counts['keystroke_data'] == 3
+    assert counts['mouse_data'] == 2
+    assert counts['behavior_sessions'] == 1
+    for table in ('keystroke_data', 'mouse_data', 'device_data', 'geo_data'):
+        assert db.fetch_one(f"SELECT COUNT(*) AS n FROM {table}")['n'] == 0
+
+
+@pytest.mark.parametrize('wrap', [bytes, bytearray, memoryview])
+def test_decode_profile_array_accepts_binary_buffers(make_db, wrap):
+    behavior = BehaviorRepository(make_db())
+    profile = np.arange(8, dtype=np.float32)
+    
+    decoded = behavior._decode_profile_array(wrap(behavior._encode_profile_array(profile)))
+    
+    assert np.array_equal(decoded, profile)
@@ -0,0 +1,15 @@
+from backend.utils import cache
+from backend.utils.cache import LRUCache
+
+
+def test_len_counts_unexpired_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    lru = LRUCache(maxsize=4)
+    lru.set('short', 1, ttl=5)
+    lru.set('long', 2, ttl=60)
+    lru.set('forever', 3)
+    
+    assert len(lru) == 3
+    now[0] += 10
+    assert len(lru) == 2
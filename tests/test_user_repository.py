@@ -0,0 +1,43 @@
+import pytest
+
+from backend.database.user_repository import LoginRateLimitError, UserRepository
+
+
+def _password_hash(db, user_id):
+    return db.fetch_one("SELECT password_hash FROM users WHERE id = ?", (user_id,))['password_hash']
+
+
+def test_login_keeps_current_password_hash(make_db):
+    db = make_db()
+    users = UserRepository(db)
+    user_id = users.create_user({'username': 'alice', 'email': 'alice@example.com', 'password': 'Passw0rd!'})
+    stored_hash = _password_hash(db, user_id)
+    
+    assert users.verify_password('alice', 'Passw0rd!')['id'] == user_id
+    assert users.verify_password('alice', 'Passw0rd!')['id'] == user_id
+    
+    assert _password_hash(db, user_id) == stored_hash
+
+
+def test_login_rate_limit_is_distinct_from_wrong_password(make_db, monkeypatch):
+    monkeypatch.setenv('LOGIN_RATE_BURST', '2')
+    users = UserRepository(make_db())
+    users.create_user({'username': 'alice', 'email': 'alice@example.com', 'password': 'Passw0rd!'})
+    
+    assert users.verify_password('alice', 'wrong', client_id='10.0.0.1') is None
+    assert users.verify_password('alice', 'wrong', client_id='10.0.0.1') is None
+    with pytest.raises(LoginRateLimitError):
+        users.verify_password('alice', 'Passw0rd!', client_id='10.0.0.1')
+    
+    assert users.verify_password('alice', 'Passw0rd!', client_id='10.0.0.2')
+
+
+def test_successful_login_refills_bucket(make_db, monkeypatch):
+    monkeypatch.setenv('LOGIN_RATE_BURST', '2')
+    users = UserRepository(make_db())
+    users.create_user({'username': 'alice', 'email': 'alice@example.com', 'password': 'Passw0rd!'})
+    
+    assert users.verify_password('alice', 'wrong') is None
+    assert users.verify_password('alice', 'Passw0rd!')
+    assert users.verify_password('alice', 'wrong') is None
+    assert users.verify_password('alice', 'Passw0rd!')